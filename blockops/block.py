@@ -8,7 +8,7 @@ Created on Thu Sep 29 13:17:29 2022
 import sympy as sy
 import numpy as np
 
-from blockops.utils.vectorize import matVecMul, matVecInv
+from blockops.utils.vectorize import matVecMul, luFactor, luSolve
 
 # -----------------------------------------------------------------------------
 # Block Operator class & specific operators
@@ -56,10 +56,69 @@ class BlockOperator(object):
         new.components = self.components.copy()
         return new
 
+    @property
+    def invert(self):
+        return self._invert
+
+    @invert.setter
+    def invert(self, invert):
+        self._invert = invert
+        self._factor = None
+
+    @property
+    def factor(self):
+        """
+        LU factorization of the invert part (see luFactor), computed once on
+        first use (batched over the nLam matrices) and then applied with
+        triangular solves. It is reset when a new invert part is set, but not
+        when the invert array is modified in place by index assignment.
+        """
+        if self._factor is None and self._invert is not None:
+            self._factor = luFactor(self._invert)
+        return self._factor
+
     @property
     def name(self):
         return self.symbol.__str__()
 
+    def compile(self, M=None):
+        """
+        Returns a copy of the block operator, where the matrix, invert and
+        scalar parts are collapsed into one dense matrix (or array of nLam
+        matrices), such that each application is one matrix-vector product.
+
+        Parameters
+        ----------
+        M : int, optional
+            Size of the blocks, required for scalar block operators.
+            The default is None, using the size of the block operator.
+
+        Returns
+        -------
+        BlockOperator
+            The compiled block operator, with the same symbol and cost.
+
+        Notes
+        -----
+        The invert part is folded in with triangular solves on its LU
+        factorization, rather than through its explicit inverse. The
+        compiled operator cannot be turned back into the original matrix
+        and invert parts.
+        """
+        M = self.M if M is None else M
+        new = self.copy()
+        if self.isScalar:
+            new.matrix = float(self.symbol)*np.eye(M)
+        elif self.isSymbolic or M == 0:
+            raise ValueError(f'cannot compile symbolic block operator {self}')
+        elif new.invert is not None:
+            # matrix @ invert^{-1}, solving with the transpose of invert
+            matrix = np.eye(M) if new.matrix is None else new.matrix
+            lu, piv = self.factor
+            new.matrix = luSolve((lu[..., None, :, :], piv[..., None, :]), matrix, trans=True)
+        new.invert = None
+        return new
+
     @property
     def M(self):
         M = 0
@@ -87,9 +146,12 @@ class BlockOperator(object):
 
     @property
     def isScalar(self):
+        # Check isSymbolic first, float conversion of large symbols is costly
+        if not self.isSymbolic:
+            return False
         try:
             float(self.symbol)
-            return self.isSymbolic
+            return True
         except TypeError:
             return False
 
@@ -262,7 +324,7 @@ class BlockOperator(object):
 
     def __call__(self, u):
         if self.invert is not None:
-            u = matVecInv(self.invert, u)
+            u = luSolve(self.factor, u)
         if self.matrix is not None:
             u = matVecMul(self.matrix, u)
         if self.isScalar:
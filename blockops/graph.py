@@ -87,6 +87,7 @@ class PintGraph:
         self.maxK = min(maxK, self.pool.maxIter)  # Maximum number of iterations over all blocks
         self.counter = 0  # Helper to have unique names per node
         self.lookup = {}  # Lookup counter to task
+        self.nodes = {}  # Lookup node of each task id
         self.pos = Position(nBlocks=nBlocks, k=maxK)  # Helper to get position of tasks
         self.generateGraphFromPool()  # Generate graph from pool
 
@@ -111,21 +112,23 @@ class PintGraph:
         self.lookup[task.result] = self.counter
 
         # Add dependencies
-        for item in task.dep:
-            self.graph.add_edge(self.lookup[self.pool.getTask(item).result], self.counter, cost=0)
+        for item in self.pool.getDependencies(task.id).tolist():
+            self.graph.add_edge(self.nodes[item], self.counter, cost=0)
+        self.nodes[task.id] = self.counter
         self.counter += 1
 
     def generateGraphFromPool(self) -> None:
         """
         Creates graph vom taskpool
         """
-        for key, value in self.pool.pool.items():
-            if value.type == 'main':
+        for i in range(self.pool.nTasks):
+            task = Task(self.pool, i)
+            if self.pool.isMain[i]:
                 # Put u_x^y tasks (main tasks) on exact positions
-                self.addTaskToGraph(pos=(value.block, value.iteration), task=value)
+                self.addTaskToGraph(pos=(task.block, task.iteration), task=task)
             else:
                 # Put subtasks of u_x_y on specific positions
-                self.addTaskToGraph(pos=self.pos.getPosition(value.block, value.iteration), task=value)
+                self.addTaskToGraph(pos=self.pos.getPosition(task.block, task.iteration), task=task)
 
     def plotGraphForOneBlock(self, k: int, n: int, figName: str = "", figSize: tuple = (6.4, 4.8), saveFig: str = ""):
         """
@@ -359,22 +362,4 @@ class PintGraph:
         length : float
             Longest path within graph
         """
-
-        # Translate to graph with only edge costs
-        newGraph = nx.DiGraph()
-        trans = {}
-        for node, node_data in self.graph.nodes(data=True):
-            name1 = f'{node}' + ".1"
-            name2 = f'{node}' + ".2"
-            newGraph.add_node(name1, cost=0, pos=(node_data['pos'][0], node_data['pos'][1] - 0.001))
-            newGraph.add_node(name2, cost=0, pos=(node_data['pos'][0], node_data['pos'][1] + 0.001))
-            newGraph.add_edge(name1, name2, cost=node_data['task'].cost)
-            trans[node] = [name1, name2]
-        for edge_from, edge_to, edge_data in self.graph.edges(data=True):
-            from_ = trans[edge_from][1]
-            to_ = trans[edge_to][0]
-            newGraph.add_edge(from_, to_, cost=edge_data['cost'])
-
-        # Compute the longest path of new graph
-        length = nx.dag_longest_path_length(newGraph, weight="cost")
-        return length
+        return self.pool.getCriticalPath()[0]
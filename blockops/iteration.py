@@ -7,16 +7,20 @@ Created on Mon Nov  7 15:40:41 2022
 """
 import numpy as np
 import sympy as sy
+import hashlib
+import copy
+from functools import partial
 from typing import Dict
 import time
 
 from blockops.block import BlockOperator, I
 from blockops.run import PintRun
 from blockops.taskPool import TaskPool
-from blockops.utils.expr import getCoeffsFromFormula
+from blockops.utils.expr import getCoeffsFromFormula, canonicalExpr
 from blockops.graph import PintGraph
-from blockops.scheduler import getSchedule
-from blockops.utils.checkRun import checkRunParameters, reduceRun
+from blockops.scheduler import getSchedule, getSchedules, getLowerBound, SCHEDULER
+from blockops.utils.checkRun import checkRunParameters, unionRunParameters, reduceRun
+from blockops.utils.vectorize import matVecMul
 
 
 # -----------------------------------------------------------------------------
@@ -91,6 +95,284 @@ class BlockIteration(object):
         # Variable to store eventual associated problem
         self.prob = None
 
+        # Canonical hash of the symbolic components, used as cache key
+        self._fingerprint = self.createFingerprint()
+
+    def createFingerprint(self) -> str:
+        """
+        Create the canonical fingerprint of the block iteration from the
+        block coefficients, the propagator, the predictor and the rules.
+        It does not depend on the order of the terms in the formulas, nor
+        on the order of the coefficients and rules.
+
+        Returns
+        -------
+        str
+            Hexadecimal SHA-256 hash.
+        """
+        coeffs = sorted((key, canonicalExpr(value.symbol)) for key, value in self.blockCoeffs.items())
+        propagator = canonicalExpr(self.propagator.symbol)
+        predictor = canonicalExpr(None if self.predictor is None else self.predictor.symbol)
+        rules = sorted((canonicalExpr(key), canonicalExpr(value)) for key, value in self.rules.items())
+        return hashlib.sha256(repr((coeffs, propagator, predictor, rules)).encode()).hexdigest()
+
+    def fingerprint(self, costs=False) -> str:
+        """
+        Canonical fingerprint of the block iteration, computed at construction.
+        Two block iterations with the same fingerprint generate the same
+        rules, hence the same task graph.
+
+        Parameters
+        ----------
+        costs : bool, optional
+            Also include the costs of the block operators, for caches of
+            results depending on the costs (runtime, schedules, ...).
+            The default is False.
+
+        Returns
+        -------
+        str
+            Hexadecimal SHA-256 hash.
+        """
+        if not costs:
+            return self._fingerprint
+        ops = sorted((name, repr(op.cost)) for name, op in self.blockOps.items())
+        ops.append(('propagator', repr(self.propagator.cost)))
+        return hashlib.sha256(repr((self._fingerprint, ops)).encode()).hexdigest()
+
+    def __eq__(self, other):
+        """
+        Two block iterations are equal if they generate the same task graph
+        with the same costs, i.e have the same fingerprint(costs=True).
+        The numerical values of the block operators are not compared.
+        """
+        if not isinstance(other, BlockIteration):
+            return NotImplemented
+        return self.fingerprint(costs=True) == other.fingerprint(costs=True)
+
+    def __hash__(self):
+        return hash(self.fingerprint(costs=True))
+
+    def _predict(self, nBlocks, u0, predSol):
+        """
+        Checks the arguments of a numerical evaluation and computes the
+        initial solution of all blocks (iteration 0).
+
+        Parameters
+        ----------
+        nBlocks : int or None
+            Number of blocks, None for the nBlocks value of the associated
+            problem.
+        u0 : M-sequence of floats or complex, or None
+            Initial solution, None for the one of the associated problem.
+        predSol : N-sequence of vector, or None
+            Prediction solution used if the block iteration has no
+            prediction rule.
+
+        Returns
+        -------
+        nBlocks : int
+            The number of blocks.
+        u : np.array of size (nBlocks+1, nLam, M) or (nBlocks+1, M)
+            The initial solution and the prediction of each block.
+        """
+        nBlocks = self.nBlocks if nBlocks is None else nBlocks
+        if nBlocks == np.inf:
+            raise ValueError('need to specify a number of blocks somehow')
+        if self.M == 0:
+            raise ValueError('cannot iterate numerically on a symbolic block iteration')
+
+        u0 = self.u0 if u0 is None else u0
+        if u0 is None:
+            raise ValueError(
+                'u0 must be provided for numerical evaluation'
+                ' of a block iteration')
+
+        u0 = np.asarray(u0)
+        if self.nLam > 1:
+            u = np.zeros((nBlocks + 1, self.nLam, self.M), dtype=u0.dtype)
+        else:
+            u = np.zeros((nBlocks + 1, self.M), dtype=u0.dtype)
+        u[0] = u0
+        if self.predictor is not None:
+            for n in range(nBlocks):
+                u[n + 1] = self.predictor(u[n])
+        else:
+            if predSol is None:
+                raise ValueError(
+                    'evaluating block iteration without prediction rule'
+                    ' requires predSol list given as argument')
+            for n in range(nBlocks):
+                u[n + 1] = predSol[n]
+        return nBlocks, u
+
+    @staticmethod
+    def _step(uPrev, coeffs):
+        """
+        Computes one iteration of the block iteration. Coefficients on the
+        previous iteration are applied to all blocks at once, only the
+        others are applied block by block.
+
+        Parameters
+        ----------
+        uPrev : np.array of size (nBlocks+1, ...)
+            Solution of all blocks at the previous iteration, including the
+            initial solution.
+        coeffs : list
+            The ((nMod, kMod), op) pairs of the block coefficients, op being
+            callable on an array of block solutions.
+
+        Returns
+        -------
+        uNext : np.array of size (nBlocks+1, ...)
+            Solution of all blocks at the next iteration.
+        """
+        nBlocks = uPrev.shape[0] - 1
+        uNext = np.zeros_like(uPrev)
+        uNext[0] = uPrev[0]
+        for (nMod, kMod), op in coeffs:
+            if kMod == 0:
+                uNext[1:] += op(uPrev[nMod:nMod + nBlocks])
+        seqCoeffs = [(nMod, kMod, op) for (nMod, kMod), op in coeffs if kMod != 0]
+        for n in range(nBlocks):
+            for nMod, kMod, op in seqCoeffs:
+                uNext[n + 1] += op((uPrev, uNext)[kMod][n + nMod])
+        return uNext
+
+    def iterate(self, nIter, nBlocks=None, u0=None, initSol=False, predSol=None, reduce=None):
+        """
+        Numerical evaluation of the block iteration, yielding the solution
+        of each iteration as soon as it is computed. Only the previous and
+        the current iterations are stored, such that the memory does not
+        grow with the number of iterations.
+
+        Parameters
+        ----------
+        nIter : int
+            Number of iterations.
+        nBlocks : int, optional
+            Number of blocks. The default takes the nBlocks value of the
+            associated problem.
+        u0 : M-sequence of floats or complex
+            Initial solution.
+        initSol : bool, optional
+            Wether or not include the initial solution in the yielded arrays.
+            The default is False.
+        predSol : N-sequence of vector, optional
+            Prediction solution used if the block iteration has no prediction
+            rule. The default is None.
+        reduce : callable, optional
+            Function applied to the solution of each iteration, its output
+            is yielded instead of the solution (e.g the maximum error for
+            each lambda). The default is None.
+
+        Yields
+        ------
+        np.array of size (nBlocks or nBlocks+1, nLam, M), or reduce output
+            The solution of each block for iterations 0 to nIter. The
+            arrays are not modified by later iterations.
+        """
+        def output(u):
+            u = u if initSol else u[1:]
+            return u if reduce is None else reduce(u)
+
+        nBlocks, u = self._predict(nBlocks, u0, predSol)
+        yield output(u)
+        coeffs = list(self.coeffs)
+        for k in range(nIter):
+            u = self._step(u, coeffs)
+            yield output(u)
+
+    def getIterations(self, nIter, uRef, tol, nBlocks=None, u0=None, predSol=None):
+        """
+        Computes, for each lambda, the first iteration for which the error
+        with a reference solution is lower than a given tolerance. Lambda
+        values are removed from the computation as soon as they converged,
+        such that the later iterations are computed only for the others.
+
+        Parameters
+        ----------
+        nIter : int
+            Maximum number of iterations.
+        uRef : np.array of size (nBlocks, nLam, M)
+            Reference solution (e.g the fine solution).
+        tol : float or nLam-sequence of float
+            Tolerance on the maximum error over blocks and nodes, for all or
+            for each lambda.
+        nBlocks : int, optional
+            Number of blocks. The default takes the nBlocks value of the
+            associated problem.
+        u0 : M-sequence of floats or complex
+            Initial solution.
+        predSol : N-sequence of vector, optional
+            Prediction solution used if the block iteration has no prediction
+            rule. The default is None.
+
+        Returns
+        -------
+        np.array of size (nLam,)
+            Number of iterations for each lambda, -1 if the tolerance is not
+            reached after nIter iterations.
+        """
+        nBlocks, u = self._predict(nBlocks, u0, predSol)
+
+        # Dense matrices of the coefficients, lambda being the first axis
+        M, nLam = self.M, self.nLam
+        u = u.reshape((nBlocks + 1, nLam, M))
+        matrices = [(key, op.compile(M).matrix) for key, op in self.coeffs]
+
+        def restrict(active):
+            return [(key, partial(matVecMul, mat[active] if mat.ndim == 3 else mat))
+                    for key, mat in matrices]
+
+        uRef = np.asarray(uRef).reshape((nBlocks, nLam, M))
+        tol = np.broadcast_to(tol, (nLam,))
+        nIters = -np.ones(nLam, dtype=int)
+        active = np.arange(nLam)
+        coeffs = restrict(active)
+        for k in range(nIter + 1):
+
+            # Remove the converged lambda values
+            err = np.max(np.abs(uRef[:, active] - u[1:]), axis=(0, -1))
+            converged = err < tol[active]
+            nIters[active[converged]] = k
+            if converged.any():
+                active = active[~converged]
+                u = u[:, ~converged]
+                coeffs = restrict(active)
+            if active.size == 0 or k == nIter:
+                break
+
+            # Next iteration for the remaining lambda values
+            u = self._step(u, coeffs)
+
+        return nIters
+
+    def compile(self):
+        """
+        Returns a copy of the block iteration where each block coefficient,
+        the predictor and the propagator are collapsed into one dense matrix
+        (or array of nLam matrices), such that each application in the
+        numerical evaluation is one batched matrix-vector product.
+        The symbols, hence the task graphs, are unchanged, and the original
+        block iteration is left untouched (see BlockOperator.compile for
+        how invert parts are folded in).
+
+        Returns
+        -------
+        BlockIteration
+            The compiled block iteration.
+        """
+        M = self.M
+        if M == 0:
+            raise ValueError('cannot compile a symbolic block iteration')
+        new = copy.copy(self)
+        new.blockCoeffs = {key: op.compile(M) for key, op in self.blockCoeffs.items()}
+        new.propagator = self.propagator.compile(M)
+        if self.predictor is not None:
+            new.predictor = self.predictor.compile(M)
+        return new
+
     @property
     def coeffs(self):
         """Return an iterator on the (key, values) of blockCoeffs"""
@@ -170,34 +452,12 @@ class BlockIteration(object):
         else:
 
             # Numerical evaluation
-            u0 = self.u0 if u0 is None else u0
-            if u0 is None:
-                raise ValueError(
-                    'u0 must be provided for numerical evaluation'
-                    ' of a block iteration')
-
-            u0 = np.asarray(u0)
-            if self.nLam > 1:
-                u = np.zeros((nIter + 1, nBlocks + 1, self.nLam, self.M), dtype=u0.dtype)
-            else:
-                u = np.zeros((nIter + 1, nBlocks + 1, self.M), dtype=u0.dtype)
-            u[:, 0] = u0
-            # Prediction
-            if self.predictor is not None:
-                for n in range(nBlocks):
-                    u[0, n + 1] = self.predictor(u[0, n])
-            else:
-                if predSol is None:
-                    raise ValueError(
-                        'evaluating block iteration without prediction rule'
-                        ' requires predSol list given as argument')
-                for n in range(nBlocks):
-                    u[0, n + 1] = predSol[n]
-            # Iterations
-            for k in range(nIter):
-                for n in range(nBlocks):
-                    for (nMod, kMod), blockOp in self.coeffs:
-                        u[k + 1, n + 1] += blockOp(u[k + kMod, n + nMod])
+            levels = self.iterate(nIter, nBlocks=nBlocks, u0=u0, initSol=True, predSol=predSol)
+            uk = next(levels)
+            u = np.zeros((nIter + 1,) + uk.shape, dtype=uk.dtype)
+            u[0] = uk
+            for k, uk in enumerate(levels):
+                u[k + 1] = uk
 
         if initSol:
             return u
@@ -211,7 +471,15 @@ class BlockIteration(object):
         schedule = getSchedule(taskPool=pool, nProc=nProc, nPoints=N + 1, schedulerType=schedulerType)
         return schedule.getRuntime()
 
-    def getPerformances(self, N, K, nProc=None, schedulerType='BLOCK-BY-BLOCK', verbose=False, run=None):
+    def getRuntimes(self, N, K, nProcList, schedulerType='BLOCK-BY-BLOCK', maxRuntime=None):
+        K = self.checkK(N=N, K=K)
+        run = PintRun(blockIteration=self, nBlocks=N, kMax=K)
+        pool = TaskPool(run=run)
+        return getSchedules(taskPool=pool, nProcList=nProcList, nPoints=N + 1, schedulerType=schedulerType,
+                            maxRuntime=maxRuntime)
+
+    def getPerformances(self, N, K, nProc=None, schedulerType='BLOCK-BY-BLOCK', verbose=False, run=None,
+                        minSpeedup=None):
 
         seqPropCost = self.propagator.cost
         if (seqPropCost is None) or (seqPropCost == 0):
@@ -223,14 +491,29 @@ class BlockIteration(object):
         K = self.checkK(N=N, K=K)
         print(f' -- computing {schedulerType} cost for K={K}')
 
+        if run is not None and not checkRunParameters(run, N, K):
+            # Extend the run without removing the rules it already contains
+            union = unionRunParameters(run, N, K)
+            if union is None:
+                run = None
+            else:
+                run.extend(nBlocks=union[0], kMax=union[1])
         if run is None:
             run = PintRun(blockIteration=self, nBlocks=N, kMax=K)
-        elif not checkRunParameters(run, N, K):
-            run = PintRun(blockIteration=self, nBlocks=N, kMax=K)
-        elif checkRunParameters(run, N, K):
-            run = reduceRun(run, N, K)
 
-        pool = TaskPool(run=run)
+        if N == run.nBlocks and K == run.kMax:
+            pool = TaskPool(run=run)
+        else:
+            pool = TaskPool(run=reduceRun(run, N, K))
+
+        # Skip the scheduling if the speedup cannot reach minSpeedup
+        if minSpeedup is not None:
+            if nProc is None:
+                nProc = SCHEDULER[schedulerType].getDefaultNProc(N)
+            bound = getLowerBound(taskPool=pool, nProc=nProc, nPoints=N + 1, schedulerType=schedulerType)
+            if runtimeTs / bound < minSpeedup:
+                return np.nan, np.nan, nProc, run
+
         schedule = getSchedule(
             taskPool=pool, nProc=nProc, nPoints=N + 1,
             schedulerType=schedulerType)
@@ -238,8 +521,7 @@ class BlockIteration(object):
         nProc = schedule.nProc
 
         if verbose:
-            graph = PintGraph(N, max(K), pool)
-            optimalRuntime = graph.longestPath()
+            optimalRuntime = pool.getCriticalPathLength()
             print('=============================')
             if self.name is None:
                 print(f'Block iteration: {self.update}')
@@ -1,72 +1,286 @@
 import os
+import glob
+import mmap
 import pickle
+import zlib
+import struct
+import tempfile
+import time
 
-from blockops.utils.checkRun import checkRunParameters, reduceRun
+from blockops.utils.checkRun import checkRunParameters, checkParameters, unionRunParameters
 #from blockops import BlockIteration, PintRun
 
-# Lookup table of all lookups that can be used
-# Key : Tuple of identifying components of a block iteration
-# Value : Path to the lookup
-lookupTable = {
-    ((0, 0), '(\\phi**(-1) - \\phi_{\\Delta}**(-1))*\\chi', (0, 1), '\\phi_{\\Delta}**(-1)*\\chi', '\\phi**(-1)*\\chi',
-     '\\phi_{\\Delta}**(-1)*\\chi'): os.path.dirname(os.path.realpath(__file__)) + '/PararealPhiChi.pickle',
-    ((0, 0), 'F - G', (0, 1), 'G', 'F', 'None'): os.path.dirname(
-        os.path.realpath(__file__)) + '/PararealFGNoPredictor.pickle',
-    ((0, 0), 'F - G', (0, 1), 'G', 'F', 'G'): os.path.dirname(os.path.realpath(__file__)) + '/PararealFG.pickle',
-    ((0, 0), 'F - P*G*R', (0, 1), 'P*G*R', 'F', 'None'): os.path.dirname(
-        os.path.realpath(__file__)) + '/PararealSCFGNoPredictor.pickle',
-    ((0, 0), 'F - P*G*R', (0, 1), 'P*G*R', 'F', 'P*G*R'): os.path.dirname(
-        os.path.realpath(__file__)) + '/testPararealSCFG.pickle',
-    ((0, 0), '\\phi_{\\Delta}**(-1)*\\chi', (1, 0), '1 - \\phi_{\\Delta}**(-1)*\\phi', '\\phi**(-1)*\\chi',
-     '1'): os.path.dirname(os.path.realpath(__file__)) + '/BlockJacobiPredictorI.pickle',
-    ((0, 0), '\\phi_{\\Delta}**(-1)*\\chi', (1, 0), '1 - \\phi_{\\Delta}**(-1)*\\phi', '\\phi**(-1)*\\chi',
-     'None'): os.path.dirname(os.path.realpath(__file__)) + '/BlockJacobiNoPredictor.pickle',
-    ((0, 0), '\\phi_{\\Delta}**(-1)*\\chi', (1, 0), '1 - \\phi_{\\Delta}**(-1)*\\phi', '\\phi**(-1)*\\chi',
-     '\\phi_{\\Delta}**(-1)*\\chi'): os.path.dirname(os.path.realpath(__file__)) + '/BlockJacobi.pickle',
-    ((0, 1), '\\phi_{\\Delta}**(-1)*\\chi', (1, 0), '1 - \\phi_{\\Delta}**(-1)*\\phi', '\\phi**(-1)*\\chi',
-     'None'): os.path.dirname(os.path.realpath(__file__)) + '/ApproxBlockGaussSeidelNoPredictor.pickle',
-    ((0, 1), '\\phi_{\\Delta}**(-1)*\\chi', (1, 0), '1 - \\phi_{\\Delta}**(-1)*\\phi', '\\phi**(-1)*\\chi',
-     '\\phi_{\\Delta}**(-1)*\\chi'): os.path.dirname(os.path.realpath(__file__)) + '/ApproxBlockGaussSeidel.pickle',
-    ((1, 0), '(1 - T_C^F*\\tilde{\\phi}_C**(-1)*T_F^C*\\phi)*(1 - \\tilde{\\phi}**(-1)*\\phi)', (0, 1),
-     'T_C^F*\\tilde{\\phi}_C**(-1)*T_F^C*\\chi', (0, 0),
-     '-T_C^F*\\tilde{\\phi}_C**(-1)*T_F^C*\\phi*\\tilde{\\phi}**(-1)*\\chi + \\tilde{\\phi}**(-1)*\\chi',
-     '\\phi**(-1)*\\chi', 'T_C^F*\\tilde{\\phi}_C**(-1)*T_F^C*\\chi'): os.path.dirname(
-        os.path.realpath(__file__)) + '/PFASST.pickle'
-}
-
-
-def picklePintRun(fileName: str, run: object, blockIteration: object) -> None:
-    """
-    Pickles an existing PinTRun and saves it to "fileName"
-
-    :param fileName: Where to save
-    :param run: PintRun to pickle
+# Version of the stored entries, entries of other versions are ignored
+CACHE_VERSION = 2
+
+# Header of the entry files, followed by the version
+MAGIC = b'BLOCKOPS'
+
+# Read-only entries shipped with blockops
+bundledDir = os.path.dirname(os.path.realpath(__file__))
+
+# Writable cache where each cold PintRun is stored (empty string to disable)
+cacheDir = os.environ.get('BLOCKOPS_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'blockops'))
+
+# Maximum size of the writable cache in bytes, least recently used entries are removed first
+cacheSize = int(os.environ.get('BLOCKOPS_CACHE_SIZE', 500 * 2 ** 20))
+
+# Minimum time in seconds between two updates of the access time of an entry
+touchInterval = 60
+
+# Last time each entry of the writable cache was marked as recently used
+# Key : Path of the entry
+# Value : Time given by time.monotonic
+touchedEntries = {}
+
+# Entries already opened by the current process
+# Key : Path of the entry
+# Value : LookupEntry
+loadedEntries = {}
+
+
+class LookupEntry:
+    """
+    Rules of a PintRun stored in the lookup cache.
+
+    The file contains one compressed pickle chunk for each (n, k) rule, followed by
+    an index giving the position of each chunk. Only the index is read
+    when the entry is opened, rules are decoded when they are requested.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Opens a stored entry
+
+        :param path: Path of the entry
+        """
+        with open(path, 'rb') as file_:
+            self.data = mmap.mmap(file_.fileno(), 0, access=mmap.ACCESS_READ)
+        header = len(MAGIC) + 4
+        if self.data[:len(MAGIC)] != MAGIC or \
+                struct.unpack('<I', self.data[len(MAGIC):header])[0] != CACHE_VERSION:
+            raise ValueError(f'{path} is not a lookup entry of version {CACHE_VERSION}')
+        indexPos = struct.unpack('<Q', self.data[-8:])[0]
+        index = pickle.loads(self.data[indexPos:-8])
+        self.nBlocks = index['nBlocks']
+        self.kMax = index['kMax']
+        self.cells = index['cells']  # Position and size of each rule
+        self.templates = index.get('templates', {})  # Generated rules and their anchor rule
+        self.rules = {}  # Already decoded rules
+
+    def getRule(self, key: tuple) -> tuple:
+        """
+        Decodes one rule
+
+        :param key: Block and iteration index of the rule
+        :return: Block rule and factorized block rule
+        """
+        if key not in self.rules:
+            pos, size = self.cells[key]
+            self.rules[key] = pickle.loads(zlib.decompress(self.data[pos:pos + size]))
+        return self.rules[key]
+
+    def reduce(self, N: int, K: list) -> object:
+        """
+        Decodes the rules needed for a run with less or equal blocks and iterations
+
+        :param N: Number of blocks
+        :param K: List of number of iterations per block
+        :return: Object containing blockRules, facBlockRules and templates
+        """
+        keys = [(n, 0) for n in range(N + 1)]
+        keys += [(n + 1, k + 1) for k in range(max(K)) for n in range(N)]
+        run = ReducedEntry(N, K)
+        for key in keys:
+            if key in self.cells:
+                run.blockRules[key], run.facBlockRules[key] = self.getRule(key)
+        run.templates = {key: anchor for key, anchor in self.templates.items()
+                         if key in run.blockRules and anchor in run.blockRules}
+        return run
+
+    @staticmethod
+    def write(path: str, run: object, keepExisting: object = None) -> None:
+        """
+        Writes the rules of a PintRun, the file is written atomically
+        such that several processes can write at the same time.
+
+        :param path: Path of the entry
+        :param run: PintRun to store
+        :param keepExisting: Function called just before the file is replaced,
+            the file is left unchanged if it returns True
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file_:
+                file_.write(MAGIC + struct.pack('<I', CACHE_VERSION))
+                cells = {}
+                for key, value in run.blockRules.items():
+                    chunk = zlib.compress(pickle.dumps((value, run.facBlockRules[key]), -1))
+                    cells[key] = (file_.tell(), len(chunk))
+                    file_.write(chunk)
+                indexPos = file_.tell()
+                file_.write(pickle.dumps({'nBlocks': run.nBlocks, 'kMax': list(run.kMax), 'cells': cells,
+                                          'templates': dict(getattr(run, 'templates', {}))}, -1))
+                file_.write(struct.pack('<Q', indexPos))
+            os.chmod(tmpPath, 0o644)
+            if keepExisting is not None and keepExisting():
+                os.remove(tmpPath)
+                return
+            os.replace(tmpPath, path)
+        except BaseException:
+            os.remove(tmpPath)
+            raise
+
+
+class ReducedEntry:
+    """
+    Rules loaded from a lookup entry for a given number of blocks and iterations
+    """
+
+    def __init__(self, N: int, K: list) -> None:
+        self.nBlocks = N
+        self.kMax = list(K)
+        self.blockRules = {}
+        self.facBlockRules = {}
+        self.templates = {}
+
+
+def getEntryPath(directory: str, blockIteration: object) -> str:
+    """
+    Path of the lookup entry of a block iteration
+
+    :param directory: Directory of the entry
+    :param blockIteration: Block iteration
+    :return: Path of the entry
+    """
+    return os.path.join(directory, f'v{CACHE_VERSION}', blockIteration.fingerprint() + '.pickle')
+
+
+def loadEntry(path: str, reload: bool = False) -> object:
+    """
+    Opens lookup entry, returns None if the file does not exist or cannot be used.
+    Entries already opened by the process are reused, unless reload is True.
+
+    :param path: Path of the entry
+    :param reload: Read the entry from disk again
+    :return: LookupEntry or None
+    """
+    if path in loadedEntries and not reload:
+        return loadedEntries[path]
+    try:
+        entry = LookupEntry(path)
+    except (OSError, ValueError, EOFError, struct.error, zlib.error, pickle.UnpicklingError):
+        entry = None
+    loadedEntries[path] = entry
+    return entry
+
+
+def storeEntry(blockIteration: object, run: object, directory: str = None) -> None:
+    """
+    Stores the rules of a PintRun, unless the existing entry covers the run
+    or is not covered by it (see unionEntryParameters to create a run
+    covering both).
+
     :param blockIteration: Associated block iteration
+    :param run: PintRun to store
+    :param directory: Cache directory (default: cacheDir)
     """
-    with open(os.path.dirname(os.path.realpath(__file__)) + '/' + fileName, "wb") as file_:
-        pickle.dump(run, file_, -1)
-    print('To add the block Iteration to the lookup table add the following part in the lookupTable dictionary:')
-    print(createTupleFromBlockIteration(blockIteration), ':',
-          'os.path.dirname(os.path.realpath(__file__))' + f"+ '/{fileName}'")
+    directory = cacheDir if directory is None else directory
+    if not directory:
+        return
+    path = getEntryPath(directory, blockIteration)
 
+    def keepExisting():
+        # Checked again before the file is replaced, another process may
+        # have stored a larger entry in the meantime
+        entry = loadEntry(path, reload=True)
+        return entry is not None and (checkRunParameters(entry, run.nBlocks, run.kMax) or
+                                      not checkParameters(run.nBlocks, run.kMax, entry.nBlocks, entry.kMax))
 
-def createTupleFromBlockIteration(blockIteration: object) -> tuple:
+    if keepExisting():
+        return
+    try:
+        LookupEntry.write(path, run, keepExisting)
+    except OSError:
+        # Cache is only an optimization, e.g the directory may be read-only
+        return
+    loadedEntries.pop(path, None)
+    if directory == cacheDir:
+        evictEntries(directory)
+
+
+def unionEntryParameters(blockIteration: object, N: int, K: list) -> tuple:
     """
-    Creates tuple from identifying settings of a BlockIteration
+    Number of blocks and iterations of a run containing both the rules for N
+    and K and the rules of the entry in the writable cache, such that storing
+    this run replaces the entry by a larger one
 
     :param blockIteration: Block iteration
-    :return: Tuple of identifying settings
+    :param N: Number of blocks
+    :param K: List of number of iterations per block
+    :return: Number of blocks and list of number of iterations per block,
+        N and K if there is no entry or no run containing both
+    """
+    if not cacheDir:
+        return N, K
+    entry = loadEntry(getEntryPath(cacheDir, blockIteration))
+    union = None if entry is None else unionRunParameters(entry, N, K)
+    return (N, K) if union is None else union
+
+
+def evictEntries(directory: str, maxSize: int = None) -> None:
+    """
+    Removes the least recently used entries until the cache is smaller than maxSize
+
+    :param directory: Cache directory
+    :param maxSize: Maximum size in bytes (default: cacheSize)
+    """
+    maxSize = cacheSize if maxSize is None else maxSize
+    entries = []
+    for path in glob.glob(os.path.join(directory, f'v{CACHE_VERSION}', '*.pickle')):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    size = sum(entry[1] for entry in entries)
+    for _, fileSize, path in sorted(entries):
+        if size <= maxSize:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        size -= fileSize
+
+
+def picklePintRun(run: object, blockIteration: object, directory: str = bundledDir) -> None:
+    """
+    Stores an existing PintRun as lookup entry, by default in the entries shipped with blockops
+
+    :param run: PintRun to pickle
+    :param blockIteration: Associated block iteration
+    :param directory: Where to save
     """
-    tmp = []
-    for key, value in blockIteration.blockCoeffs.items():
-        tmp.append(key)
-        tmp.append(value.name)
-    tmp.append(blockIteration.propagator.name)
-    if blockIteration.predictor is not None:
-        tmp.append(blockIteration.predictor.name)
-    else:
-        tmp.append('None')
-    return tuple(tmp)
+    storeEntry(blockIteration, run, directory=directory)
+
+
+def touchEntry(path: str) -> None:
+    """
+    Marks an entry as recently used for the eviction of the cache. The
+    modification time is updated at most once every touchInterval seconds.
+
+    :param path: Path of the entry
+    """
+    now = time.monotonic()
+    if path in touchedEntries and now - touchedEntries[path] < touchInterval:
+        return
+    try:
+        os.utime(path)
+    except OSError:
+        return
+    touchedEntries[path] = now
 
 
 def findEntry(blockIteration: object, N: int, K: list) -> tuple:
@@ -77,17 +291,21 @@ def findEntry(blockIteration: object, N: int, K: list) -> tuple:
     :param blockIteration: Blockiteration
     :param N: Number of blocks
     :param K: List of number of iterations per block
-    :return: Found and PintRun if found
+    :return: Found and entry reduced to N and K if found
     """
-    path = lookupTable.get(createTupleFromBlockIteration(blockIteration), None)
-
-    if path is None or not os.path.isfile(path):
-        return False, None
-
-    load = pickle.load(open(path, "rb", -1))
-
-    if not checkRunParameters(load, N, K):
-        return False, None
+    for directory in [bundledDir, cacheDir]:
+        if not directory:
+            continue
+        path = getEntryPath(directory, blockIteration)
+        cached = path in loadedEntries
+        load = loadEntry(path)
+        if directory == cacheDir and cached and (load is None or not checkRunParameters(load, N, K)):
+            # Another process may have stored a (larger) entry in the meantime
+            load = loadEntry(path, reload=True)
+        if load is None or not checkRunParameters(load, N, K):
+            continue
+        if directory == cacheDir:
+            touchEntry(path)
+        return True, load.reduce(N, K)
 
-    reduceRun(load, N, K, useCopy=False)
-    return True, load
+    return False, None
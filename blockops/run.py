@@ -1,11 +1,16 @@
 # Python imports
-import copy
+import os
 import re
+import pickle
+import tempfile
 import sympy as sy
 
 # BlockOps import
-from blockops.utils.expr import Generator, getFactorizedRule
-from blockops.lookup.lookupTable import findEntry
+from blockops.utils.expr import Generator, getFactorizedRule, getShiftMapping, getFixedTerms, keepsOrder, \
+    shiftSymbols
+from blockops.utils.wordAlgebra import WordAlgebra, Form, ContractionIndex
+from blockops.utils.checkRun import reduceRun
+from blockops.lookup.lookupTable import findEntry, storeEntry, unionEntryParameters
 
 
 class PintRun:
@@ -18,7 +23,13 @@ class PintRun:
     block iteration.
     """
 
-    def __init__(self, blockIteration, nBlocks: int, kMax: list, useLookup: bool = True) -> None:
+    # Attributes saved in the checkpoints
+    CHECKPOINT_STATE = ['algebra', 'multiStepRule', 'approxToComputationNZero', 'computationToApproxNZero',
+                        'equBlockCoeff', 'generator', 'levels', 'anchors', 'templates', 'blockRules',
+                        'facBlockRules', 'exactPropagated', 'startBlock']
+
+    def __init__(self, blockIteration, nBlocks: int, kMax: list, useLookup: bool = True,
+                 checkpoint: str = None) -> None:
         """
         Constructor to initialize a parallel-in-time run.
 
@@ -30,48 +41,106 @@ class PintRun:
             Number of blocks
         kMax : list
             Number of iterations per block
+        useLookup : bool
+            Load the rules from the lookup cache if possible, and store them
+            in the cache if they are created
+        checkpoint : str, optional
+            File where the state of the run is saved after each iteration
+            level. If the file exists, the rules are created starting from
+            the saved state. The file is removed once all rules are created.
         Returns
         -------
         expr : sy.Symbol
             Symbol for u_n_k
         """
         self.blockIteration = blockIteration  # The block iteration
+        self.useLookup = useLookup  # Use the lookup cache
+        self.checkpoint = checkpoint  # File to save the state after each iteration level
         self.nBlocks = nBlocks  # Number of blocks
         self.kMax = kMax  # Maximum number of iterations per block
+        self.algebra = WordAlgebra(rules=blockIteration.rules)  # Native representation of the rules
+        self.initExpressions()
+
+        # Create blockRules and facBlockRules if no lookup entry exists
+        # and store them in the lookup cache
+        # Otherwise load both from the lookup entry
+        lookUp, res = findEntry(blockIteration, nBlocks, kMax) if useLookup else (False, None)
+        if not lookUp:
+            if useLookup and checkpoint is None:
+                self.nBlocks, self.kMax = unionEntryParameters(blockIteration, nBlocks, kMax)
+            # Iterate over all expression
+            self.createExpressions()
+
+            self.factorizeBlockRules()
+            if checkpoint is not None:
+                self.removeCheckpoint()
+            if useLookup:
+                self.storeRules(nBlocks, kMax)
+        else:
+            self.blockRules = res.blockRules
+            self.facBlockRules = res.facBlockRules
+            self.templates = res.templates
+
+    def initExpressions(self) -> None:
+        """
+        (Re)initialize all rules and the intermediate dictionaries used to create them
+        """
         self.approxToComputation = {}  # Dictionary result to rule for simplifications
         self.computationToApprox = {}  # Dictionary rule to result for simplifications
         self.approxToComputationNZero = {}  # Dictionary result to rule for simplifications for the first block
         self.computationToApproxNZero = {}  # Dictionary rule to result for simplifications for the first block
         self.equBlockCoeff = {}  # Dictionary for simplifications of equivalent block coefficients
-        self.generator = [Generator(i) for i in range(max(kMax) + 1)]  # Rule generator for reduced computation times
+        self.indices = {}  # Contraction index of the rule to result dictionaries
+        self.generator = [Generator(i) for i in range(max(self.kMax) + 1)]  # Rule generator for reduced computation times
+        self.levels = []  # State after each iteration level, used to extend the run
+        self.anchors = {}  # Rule of each level from which the generated rules are shifted
+        self.templates = {}  # Generated rules (key) and the rule they are shifted from (value)
+        self.anchorSymbols = {}  # Symbols of the anchor rules, sorted by name
+        self.fixedTerms = {}  # Sub-expressions of the (factorized) anchor rules not changed by the shifts
         self.blockRules = {}
         self.facBlockRules = {}
-        self.exactPropagated = self.createSymbolForUnk(0, 0)
+        self.exactPropagated = self.createUnknown(0, 0)
         self.startBlock = 0
 
         self.blockRules[(0, 0)] = {'result': self.createSymbolForUnk(0, 0),
                                    'rule': sy.core.numbers.Zero() * sy.core.numbers.Zero()}
 
+        self.createMultiStepRule()
+
+    def createMultiStepRule(self) -> None:
+        """
+        Create the rules replacing propagations of negative blocks
+        """
         self.multiStepRule = {}
         for key, value in self.blockIteration.blockCoeffs.items():
             if key[0] < 0:
                 for i in range(key[0], 0, 1):
-                    for z in range(max(kMax)):
-                        newKey = self.blockIteration.propagator.symbol * self.createSymbolForUnk(n=i, k=z)
-                        newValue = self.createSymbolForUnk(n=i + 1, k=z)
+                    for z in range(max(self.kMax)):
+                        newKey = self.algebra.apply(self.blockIteration.propagator.symbol,
+                                                    self.createUnknown(n=i, k=z))
+                        newValue = self.createUnknown(n=i + 1, k=z)
                         self.multiStepRule[newKey] = newValue
 
-        # Create blockRules and facBlockRules if no lookup entry exists
-        # Otherwise load both from the lookup entry
-        lookUp, res = findEntry(blockIteration, nBlocks, kMax)
-        if not lookUp or not useLookup:
-            # Iterate over all expression
-            self.createExpressions()
+    def createUnknown(self, n: int, k: int) -> tuple:
+        """
+        Create the native representation of one approximation u_n_k
 
-            self.factorizeBlockRules()
+        Parameters
+        ----------
+        n : int
+            Current block
+        k : int
+            Current iteration
+
+        Returns
+        -------
+        u : tuple
+            Block and iteration index of u_n_k
+        """
+        if k > self.kMax[n]:
+            return (n, self.kMax[n])
         else:
-            self.blockRules = res.blockRules
-            self.facBlockRules = res.facBlockRules
+            return (n, k)
 
     def createSymbolForUnk(self, n: int, k: int) -> sy.Symbol:
         """
@@ -89,12 +158,9 @@ class PintRun:
         expr : sy.Symbol
             Symbol for u_n_k
         """
-        if k > self.kMax[n]:
-            return sy.symbols(f'u_{n}^{self.kMax[n]}', commutative=False)
-        else:
-            return sy.symbols(f'u_{n}^{k}', commutative=False)
+        return self.algebra.symbol(self.createUnknown(n, k))
 
-    def createIterationRule(self, n: int, k: int):
+    def createIterationRule(self, n: int, k: int) -> Form:
         """
         Create iteration rule for one block and iteration
 
@@ -107,17 +173,13 @@ class PintRun:
 
         Returns
         -------
-        expr : sy.Symbol, sy.Mul, sy.Add
+        expr : Form
             Iteration rule
         """
+        return self.algebra.add(*[self.algebra.apply(op.symbol, self.createUnknown(n=n + nMod - 1, k=k + kMod - 1))
+                                  for (nMod, kMod), op in self.blockIteration.coeffs])
 
-        iterationRule = sy.core.numbers.Zero()
-        for (nMod, kMod), op in self.blockIteration.coeffs:
-            iterationRule += op.symbol * self.createSymbolForUnk(n=n + nMod - 1, k=k + kMod - 1)
-        iterationRule = iterationRule.simplify().expand()
-        return iterationRule
-
-    def createPredictionRule(self, n: int):
+    def createPredictionRule(self, n: int) -> Form:
         """
         Create prediction rule for one block
 
@@ -128,91 +190,72 @@ class PintRun:
 
         Returns
         -------
-        expr : sy.Symbol, sy.Mul, sy.Add
+        expr : Form
             Predictor rule
         """
-
         pred = self.blockIteration.predictor
-        predictorRule = pred.symbol * self.createSymbolForUnk(n=n - 1, k=0)
-        predictorRule = predictorRule.simplify().expand()
-        return predictorRule
-
-    def checkForNegativBlocks(self, expr):
-        result = re.compile("u_-").search(str(expr))
-        if result is None:
-            return False
-        else:
-            return True
+        return self.algebra.apply(pred.symbol, self.createUnknown(n=n - 1, k=0))
+
+    def checkForNegativBlocks(self, expr: Form) -> bool:
+        return any(u[0] < 0 for u in expr.atoms())
 
-    def substituteAndSimplify(self, expr, res, n: int):
+    def substituteAndSimplify(self, expr: Form, res: tuple, n: int) -> Form:
         """
         Simplifies expression
 
         Parameters
         ----------
-        expr : sy.Symbol, sy.Mul, sy.Add
+        expr : Form
             The expression to be simplified
-        k : int
-            Current iteration
+        res : tuple
+            The unknown computed by the expression
+        n : int
+            Current block
 
         Returns
         -------
-        expr : sy.Symbol, sy.Mul, sy.Add
+        expr : Form
             Simplified expression
         """
+        algebra = self.algebra
 
         if len(self.multiStepRule) and self.checkForNegativBlocks(expr):
-            expr = expr.subs(self.multiStepRule)
+            for key, value in self.multiStepRule.items():
+                expr = algebra.contract(expr, key, value)
 
         # Check if rules for the block operation exist
         ruleSimplifaction = len(self.blockIteration.rules) > 0
 
         # Expand expression based on previous result:rule pairs
-        # Consider only pairs which are directly present in the expression to speed up substitution
         # Special treatment of block zero
         if n > 0:
-            expr = expr.subs({key: self.approxToComputation[key] for key in
-                              [atoms for atoms in expr.atoms() if str(atoms).startswith('u')] if
-                              key in self.approxToComputation})
+            expr = algebra.substitute(expr, self.approxToComputation)
+            computationToApprox = self.computationToApprox
         else:
-            expr = expr.subs({key: self.approxToComputationNZero[key] for key in
-                              [atoms for atoms in expr.atoms() if str(atoms).startswith('u')] if
-                              key in self.approxToComputationNZero})
+            expr = algebra.substitute(expr, self.approxToComputationNZero)
+            computationToApprox = self.computationToApproxNZero
 
         # Apply rules if present
         if ruleSimplifaction:
-            expr = expr.subs(self.blockIteration.rules)
+            expr = algebra.applyRules(expr)
 
-        # Special treatment of block zero
-        if n > 0:
-            for key, value in self.computationToApprox.items():
-                expr = expr.subs({key: self.computationToApprox[key]})
-        else:
-            for key, value in self.computationToApproxNZero.items():
-                expr = expr.subs({key: self.computationToApproxNZero[key]})
-        # else:
-        #     reducedCompuToApprox = {item2[1]: self.computationToApprox[item2[1]] for item2 in
-        #                             [[key.atoms(), key] for key, value in self.computationToApprox.items()] if
-        #                             set(item2[0]).intersection(
-        #                                 set([atoms for atoms in expr.atoms() if str(atoms).startswith('u')]))}
-        #     for key, value in reducedCompuToApprox.items():
-        #         expr = expr.subs({key: value})
+        # Replace already computed expressions by their results
+        index = self.getIndex(computationToApprox)
+        expr = index.contract(expr)
         tmp = expr
         # Apply rules if present
         if ruleSimplifaction:
-            tmp = tmp.subs(self.blockIteration.rules)
+            tmp = algebra.applyRules(tmp)
 
         # Simplify if equivalent block iterations exists (in terms of u_x_y = u_z_k)
         if len(self.equBlockCoeff) > 0:
-            expr = tmp.subs(self.equBlockCoeff)
+            expr = algebra.substitute(tmp, self.equBlockCoeff)
             if tmp != expr:
-                if n > 0:
-                    expr = expr.subs(self.computationToApprox)
-                else:
-                    expr = expr.subs(self.computationToApproxNZero)
+                # Replace the most complex computed expressions first
+                expr = index.contract(expr, bySize=True)
                 # Apply rules if present
                 if ruleSimplifaction:
-                    expr = expr.subs(self.blockIteration.rules)
+                    expr = algebra.applyRules(expr)
         else:
             expr = tmp
 
@@ -220,94 +263,352 @@ class PintRun:
         # from an exact state, only this propagation is used and all other
         # computation of the block are discared. Further, the last exact state
         # and the latest exact block index is updated.
-        if str(self.blockIteration.propagator.symbol * self.exactPropagated) in str(expr):
-            expr = self.blockIteration.propagator.symbol * self.exactPropagated
+        if algebra.containsProduct(expr, self.blockIteration.propagator.symbol, self.exactPropagated):
+            expr = algebra.apply(self.blockIteration.propagator.symbol, self.exactPropagated)
             self.exactPropagated = res
-            self.startBlock = int(str(res).replace('^', '_').split('_')[1])
+            self.startBlock = res[0]
 
         return expr
 
+    def getIndex(self, computationToApprox: dict) -> ContractionIndex:
+        """
+        Returns the contraction index of a rule to result dictionary
+
+        Parameters
+        ----------
+        computationToApprox : dict
+            Rules as keys, results as values
+
+        Returns
+        -------
+        index : ContractionIndex
+            Index used to replace the rules by their results
+        """
+        index = self.indices.get(id(computationToApprox))
+        if index is None or index.table is not computationToApprox:
+            index = ContractionIndex(self.algebra, computationToApprox)
+            self.indices[id(computationToApprox)] = index
+        return index
+
     def createExpressions(self):
         """
         Creates all rules and result for a given block iteration
         """
+        kStart = 0 if self.checkpoint is None else self.loadCheckpoint()
+        for k in range(kStart, max(self.kMax) + 1):
+            self.createLevel(k)
+            if self.checkpoint is not None:
+                self.factorizeBlockRules()
+                self.saveCheckpoint()
+
+    def saveCheckpoint(self) -> None:
+        """
+        Saves the state of the run after a completed iteration level.
+        The file is written atomically, such that an interrupted run always
+        leaves a valid checkpoint.
+        """
+        directory = os.path.dirname(os.path.abspath(self.checkpoint))
+        os.makedirs(directory, exist_ok=True)
+        state = {name: getattr(self, name) for name in self.CHECKPOINT_STATE}
+        state['id'] = (self.blockIteration.fingerprint(), self.nBlocks, list(self.kMax))
+        fd, tmpPath = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file_:
+                pickle.dump(state, file_, -1)
+            os.replace(tmpPath, self.checkpoint)
+        except BaseException:
+            os.remove(tmpPath)
+            raise
+
+    def loadCheckpoint(self) -> int:
+        """
+        Restores the state of the run from the checkpoint file, if it exists
+        and was saved for the same block iteration, blocks and iterations.
+
+        Returns
+        -------
+        kStart : int
+            First iteration level that remains to be created
+        """
+        try:
+            with open(self.checkpoint, 'rb') as file_:
+                state = pickle.load(file_)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return 0
+        if state.get('id') != (self.blockIteration.fingerprint(), self.nBlocks, list(self.kMax)):
+            return 0
+        for name in self.CHECKPOINT_STATE:
+            setattr(self, name, state[name])
+        return len(self.levels)
+
+    def removeCheckpoint(self) -> None:
+        """
+        Removes the checkpoint file once all rules are created
+        """
+        try:
+            os.remove(self.checkpoint)
+        except OSError:
+            pass
+
+    def createLevel(self, k: int, nStart: int = 0) -> None:
+        """
+        Creates the rules and results of one iteration level for all blocks
+        starting from nStart. If the level was already created for the
+        previous blocks, its stored state is used to resume the computation.
+
+        Parameters
+        ----------
+        k : int
+            Iteration level (0 for the prediction)
+        nStart : int
+            First block for which rules are created
+        """
+        if k < len(self.levels):
+            tmpDicoATC, tmpDicoCTA, self.startBlock, self.exactPropagated = self.levels[k]
+        else:
+            tmpDicoATC, tmpDicoCTA = {}, {}
+
+        # Rules of the current level are added to the ones of the previous level
+        if k > 0:
+            self.approxToComputation = {**self.levels[k - 1][0], **tmpDicoATC}
+            self.computationToApprox = {**self.levels[k - 1][1], **tmpDicoCTA}
+        else:
+            self.approxToComputation = tmpDicoATC
+            self.computationToApprox = tmpDicoCTA
 
-        # Iterate over all blocks
-        for n in range(self.nBlocks):
-            if n >= self.startBlock:
+        self.indices = {}
+        for n in range(nStart, self.nBlocks):
+            if n < self.startBlock:
+                continue
+            if k == 0:
                 # If no prediction is given, set rule to zero
                 if self.blockIteration.predictor is None:
                     self.blockRules[(n + 1, 0)] = {'result': self.createSymbolForUnk(n + 1, 0),
                                                    'rule': sy.core.numbers.Zero()}
-                # If predictor is given:
+                    continue
+            elif k > self.kMax[n + 1]:
+                continue
+
+            # Create results
+            res = self.createUnknown(n=n + 1, k=k)
+            # Create rule for block n
+
+            # If no patterns is detected (mode == 0), substitute
+            # all existing rules and simplify as much as possible
+            if self.generator[k].mode == 0:
+                if k == 0:
+                    rule = self.createPredictionRule(n=n + 1)
                 else:
-                    # Create results
-                    res = self.createSymbolForUnk(n=n + 1, k=0)
-                    # Create rule for block n
-
-                    # If no patterns is detected (mode == 0), substitute
-                    # all existing rules and simplify as much as possible
-                    if self.generator[0].mode == 0:
-                        # If pattern is not detected
-                        rule = self.substituteAndSimplify(self.createPredictionRule(n=n + 1), res, n)
-                        self.generator[0].check(rule, n + 1)
-                    # Else create rule based on pattern
-                    else:
-                        rule = self.generator[0].generatingExpr(n=n + 1)
-                    # Save rule and results in dictionaries for next iterations and blocks
-                    if len(rule.args) > 0:
-                        self.approxToComputation[res] = rule
-                        self.computationToApprox[rule] = res
-                        if n == 0:
-                            self.computationToApproxNZero[rule] = res
-                            self.approxToComputationNZero[res] = rule
-                    else:
-                        self.equBlockCoeff[res] = rule
-                    self.blockRules[(n + 1, 0)] = {'result': res, 'rule': rule}
-
-        # Iterate over iterations and blocks
-        for k in range(max(self.kMax)):
-            tmpDicoATC = {}
-            tmpDicoCTA = {}
-            for n in range(self.nBlocks):
-                if n >= self.startBlock:
-                    if k < self.kMax[n + 1]:
-                        # Create results
-                        res = self.createSymbolForUnk(n=n + 1, k=k + 1)
-                        # Create rule for block n
-
-                        # If no patterns is detected (mode == 0), substitute
-                        # all existing rules and simplify as much as possible
-                        if self.generator[k + 1].mode == 0:
-                            rule = self.substituteAndSimplify(self.createIterationRule(n=n + 1, k=k + 1), res, n)
-                            self.generator[k + 1].check(rule, n + 1)
-                        # Else create rule based on pattern
-                        else:
-                            rule = self.generator[k + 1].generatingExpr(n=n + 1)
-                        # Save rule and results in dictionaries for next iterations and blocks
-                        if len(rule.args) > 0:
-                            self.computationToApprox[rule] = res
-                            self.approxToComputation[res] = rule
-                            tmpDicoCTA[rule] = res
-                            tmpDicoATC[res] = rule
-                            if n == 0:
-                                self.computationToApproxNZero[rule] = res
-                                self.approxToComputationNZero[res] = rule
-                        else:
-                            self.equBlockCoeff[res] = rule
-
-                        self.blockRules[(n + 1, k + 1)] = {'result': res, 'rule': rule}
-            self.computationToApprox = tmpDicoCTA
-            self.approxToComputation = tmpDicoATC
+                    rule = self.createIterationRule(n=n + 1, k=k)
+                rule = self.substituteAndSimplify(rule, res, n)
+                expr = self.algebra.toSympy(rule)
+                self.generator[k].check(rule, n + 1)
+            # Else create rule based on pattern
+            else:
+                rule = self.generator[k].generatingExpr(n=n + 1)
+                expr = self.shiftRule(n=n + 1, k=k)
+                if expr is None:
+                    expr = self.algebra.toSympy(rule)
+                    self.anchors[k] = (n + 1, k)
+            # Save rule and results in dictionaries for next iterations and blocks
+            if not rule.isAtomic:
+                self.computationToApprox[rule] = res
+                self.approxToComputation[res] = rule
+                tmpDicoCTA[rule] = res
+                tmpDicoATC[res] = rule
+                if n == 0:
+                    self.computationToApproxNZero[rule] = res
+                    self.approxToComputationNZero[res] = rule
+            else:
+                self.equBlockCoeff[res] = rule
+
+            self.blockRules[(n + 1, k)] = {'result': self.algebra.symbol(res), 'rule': expr}
+
+        self.computationToApprox = tmpDicoCTA
+        self.approxToComputation = tmpDicoATC
+        self.indices = {}
+        state = (tmpDicoATC, tmpDicoCTA, self.startBlock, self.exactPropagated)
+        if k < len(self.levels):
+            self.levels[k] = state
+        else:
+            self.levels.append(state)
+
+    def shiftRule(self, n: int, k: int):
+        """
+        Creates the SymPy rule of block n by renaming the unknowns of the
+        anchor rule of the level, i.e the first rule following the pattern.
+
+        SymPy sorts the terms of a rule by the names of its symbols, such
+        that the renamed rule is only valid if the shift keeps the order of
+        all names (which is not the case for u_9 -> u_10 for instance).
+        Otherwise, the rule is created from the pattern and becomes the new
+        anchor of the level.
+
+        Parameters
+        ----------
+        n : int
+            Current block
+        k : int
+            Current iteration
+
+        Returns
+        -------
+        expr : sy.Expr or None
+            Rule for block n, None if it cannot be obtained by renaming
+        """
+        anchor = self.anchors.setdefault(k, (self.generator[k].templateBlock, k))
+        if anchor not in self.blockRules:
+            return None
+        symbols = self.getAnchorSymbols(anchor)
+        mapping = getShiftMapping(symbols, n - anchor[0], symbol=self.algebra.symbol)
+        if not keepsOrder(symbols, mapping):
+            return None
+        self.templates[(n, k)] = anchor
+        return self.shiftAnchor(anchor, mapping)
+
+    def getAnchorSymbols(self, anchor: tuple) -> list:
+        """
+        Returns the symbols of an anchor rule sorted by name, computed once
+        for all the rules shifted from it
+
+        Parameters
+        ----------
+        anchor : tuple
+            Key of the anchor rule
+
+        Returns
+        -------
+        symbols : list of sy.Symbol
+            Symbols of the rule
+        """
+        if anchor not in self.anchorSymbols:
+            self.anchorSymbols[anchor] = sorted(self.blockRules[anchor]['rule'].free_symbols, key=lambda s: s.name)
+        return self.anchorSymbols[anchor]
+
+    def shiftAnchor(self, anchor: tuple, mapping: dict, factorized: bool = False):
+        """
+        Renames the unknowns of an anchor rule, only the sub-expressions
+        containing unknowns are created again.
+
+        Parameters
+        ----------
+        anchor : tuple
+            Key of the anchor rule
+        mapping : dict
+            Old symbol to new symbol, see getShiftMapping
+        factorized : bool
+            Rename the factorized rule instead of the rule
+
+        Returns
+        -------
+        expr : sy.Expr or dict
+            Renamed (factorized) rule
+        """
+        rule = (self.facBlockRules if factorized else self.blockRules)[anchor]['rule']
+        if (anchor, factorized) not in self.fixedTerms:
+            self.fixedTerms[(anchor, factorized)] = getFixedTerms(rule, mapping)
+        return shiftSymbols(rule, mapping, self.fixedTerms[(anchor, factorized)])
+
+    def extend(self, nBlocks: int = None, kMax: list = None) -> None:
+        """
+        Extends the run to more blocks and/or iterations, creating only
+        the rules that are not yet computed.
+
+        The run is loaded from the lookup cache or rebuilt from scratch if
+        it cannot be resumed, e.g if it was loaded from the lookup cache, if
+        the number of blocks decreases or if the number of iterations changes
+        for a block that did not reach the maximum number of iterations.
+
+        Parameters
+        ----------
+        nBlocks : int, optional
+            New number of blocks (default: unchanged)
+        kMax : list, optional
+            New number of iterations per block (default: unchanged)
+        """
+        nBlocks = self.nBlocks if nBlocks is None else nBlocks
+        kMax = self.kMax if kMax is None else kMax
+
+        oldBlocks, oldKMax, nLevels = self.nBlocks, self.kMax, len(self.levels)
+        resumable = nLevels > 0 and nBlocks >= oldBlocks and all(
+            new >= old if old == max(oldKMax) else new == old
+            for old, new in zip(oldKMax, kMax))
+
+        self.nBlocks = nBlocks
+        self.kMax = kMax
+        if resumable:
+            self.generator += [Generator(i) for i in range(len(self.generator), max(kMax) + 1)]
+            self.createMultiStepRule()
+            for k in range(max(kMax) + 1):
+                if k < nLevels:
+                    state = self.levels[k][2:]
+                    self.createLevel(k, nStart=oldBlocks)
+                    # New blocks changed the exact state used by the next levels
+                    if k < nLevels - 1 and self.levels[k][2:] != state:
+                        resumable = False
+                        break
+                else:
+                    self.createLevel(k)
+        if resumable:
+            # Keep the order of a run created from scratch
+            self.blockRules = {key: self.blockRules[key]
+                               for key in sorted(self.blockRules, key=lambda x: (x[1], x[0]))}
+        else:
+            self.initExpressions()
+            lookUp, res = findEntry(self.blockIteration, nBlocks, kMax) if self.useLookup else (False, None)
+            if lookUp:
+                self.blockRules = res.blockRules
+                self.facBlockRules = res.facBlockRules
+                self.templates = res.templates
+                return
+            if self.useLookup and self.checkpoint is None:
+                self.nBlocks, self.kMax = unionEntryParameters(self.blockIteration, nBlocks, kMax)
+            self.createExpressions()
+        self.factorizeBlockRules()
+        if self.checkpoint is not None:
+            self.removeCheckpoint()
+        if self.useLookup:
+            self.storeRules(nBlocks, kMax)
+
+    def storeRules(self, nBlocks: int, kMax: list) -> None:
+        """
+        Stores the rules in the lookup cache. If they were created for more
+        blocks or iterations, to also cover the entry already in the cache,
+        the run is then reduced to the requested blocks and iterations.
+
+        Parameters
+        ----------
+        nBlocks : int
+            Requested number of blocks
+        kMax : list
+            Requested number of iterations per block
+        """
+        storeEntry(self.blockIteration, self)
+        if self.nBlocks != nBlocks or list(self.kMax) != list(kMax):
+            reduceRun(self, nBlocks, kMax, useCopy=False)
+            self.nBlocks, self.kMax = nBlocks, kMax
 
     def factorizeBlockRules(self) -> None:
         """
-        Factorizes the block rules and saves everything in a dictionary
+        Factorizes the block rules and saves everything in a dictionary.
+        Generated rules are obtained by renaming the factorized anchor rule.
+
+        The factorization is done on the SymPy rules, since the grouping
+        of the terms (and hence the tasks) follows SymPy's canonical order.
         """
         for key, value in self.blockRules.items():
-            self.facBlockRules[key] = {'rule': self.factorize(rule=value['rule'], res=value['result']),
-                                       'result': value['result']
-                                       }
+            if key not in self.facBlockRules:
+                if key in self.templates:
+                    anchor = self.templates[key]
+                    mapping = getShiftMapping(self.getAnchorSymbols(anchor), key[0] - anchor[0],
+                                              symbol=self.algebra.symbol)
+                    rule = self.shiftAnchor(anchor, mapping, factorized=True)
+                else:
+                    rule = self.factorize(rule=value['rule'], res=value['result'])
+                self.facBlockRules[key] = {'rule': rule,
+                                           'result': value['result']
+                                           }
+        self.facBlockRules = {key: self.facBlockRules[key] for key in self.blockRules}
 
     def factorize(self, rule, res: sy.Symbol) -> dict:
         """
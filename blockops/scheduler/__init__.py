@@ -41,6 +41,117 @@ class ScheduledTask:
         self.color = color
 
 
+class ProcessAvailability:
+    """
+    Helper class storing the time from which each process is available.
+
+    The times are stored in a min segment tree, such that the first process
+    available at a given time is found in O(log nProc). Processes can be
+    added on the fly, e.g. for schedulers assuming unlimited processes.
+    """
+
+    def __init__(self, nProc: int) -> None:
+        """
+        Constructor for ProcessAvailability, all processes are available at 0
+
+        Parameters
+        ----------
+        nProc : int
+            The number of processes
+        """
+        self.nProc = 0
+        self.size = 0
+        self.tree = []
+        self.build(times=[0] * nProc, size=max(nProc, 1))
+
+    def build(self, times: list, size: int) -> None:
+        """
+        Builds the tree for given availability times
+
+        Parameters
+        ----------
+        times : list
+            Time from which each process is available
+        size : int
+            Minimum number of processes that can be stored
+        """
+        self.nProc = len(times)
+        self.size = 1
+        while self.size < size:
+            self.size *= 2
+        self.tree = [np.inf] * self.size + list(times) + [np.inf] * (self.size - self.nProc)
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = min(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def __len__(self) -> int:
+        return self.nProc
+
+    def __getitem__(self, proc: int) -> float:
+        return self.tree[self.size + proc]
+
+    def __setitem__(self, proc: int, time: float) -> None:
+        node = self.size + proc
+        self.tree[node] = time
+        node //= 2
+        while node > 0:
+            self.tree[node] = min(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+    @property
+    def times(self) -> np.ndarray:
+        """Time from which each process is available"""
+        return np.array(self.tree[self.size:self.size + self.nProc])
+
+    def first(self, time: float):
+        """
+        Returns the first process available at a given time
+
+        Parameters
+        ----------
+        time : float
+            The time
+
+        Returns
+        -------
+        proc : int, None
+            The process with the lowest rank available at *time*, None if
+            no process is available
+        """
+        if self.tree[1] > time:
+            return None
+        node = 1
+        while node < self.size:
+            node = 2 * node if self.tree[2 * node] <= time else 2 * node + 1
+        return node - self.size
+
+    def earliest(self) -> int:
+        """
+        Returns the first process available at the earliest time
+
+        Returns
+        -------
+        proc : int
+            The process with the lowest rank among the earliest available
+        """
+        return self.first(self.tree[1])
+
+    def addProcess(self) -> int:
+        """
+        Adds a process, available at 0
+
+        Returns
+        -------
+        proc : int
+            The rank of the new process
+        """
+        if self.nProc == self.size:
+            self.build(times=self.tree[self.size:], size=2 * self.size)
+        proc = self.nProc
+        self.nProc += 1
+        self[proc] = 0
+        return proc
+
+
 @setParams(
     taskPool=TaskPoolParam(),
     nProc=PositiveInteger(),
@@ -67,12 +178,25 @@ class Scheduler(ABC, ParamClass):
         """
         Constructor for abstract scheduler class
         """
-        self.schedule = {}
         self.taskPool = taskPool
+        self.nPoints = nPoints
+        self.reset(nProc)
+
+    def reset(self, nProc: int) -> None:
+        """
+        Clears the schedule, such that a new schedule can be computed for
+        another number of processes. Data that depends only on the task
+        pool is kept.
+
+        Parameters
+        ----------
+        nProc : int
+            The number of processes
+        """
+        self.schedule = {}
         self.makespan = 0
         self.nProc = nProc
         self.startPointProc = np.zeros(self.nProc)
-        self.nPoints = nPoints
 
     @abstractmethod
     def computeSchedule(self):
@@ -88,6 +212,34 @@ class Scheduler(ABC, ParamClass):
         """Return a default number of processors for a given number of block"""
         return None
 
+    @classmethod
+    def getLowerBounds(cls, taskPool: TaskPool, nProc: int, nPoints: int) -> dict:
+        """
+        Returns lower bounds for the runtime of a schedule, computed
+        without scheduling the tasks
+
+        Parameters
+        ----------
+        taskPool : TaskPool
+            Task pool containing all tasks to be scheduled
+        nProc : int, None
+            The number of processes, None if not limited
+        nPoints : int
+            The number of blocks
+
+        Returns
+        -------
+        bounds : dict
+            The bounds with the following keys :
+
+            - criticalPath : cost of the longest path in the task graph
+            - work : total cost of the tasks divided by the number of processes
+        """
+        bounds = {'criticalPath': taskPool.getCriticalPathLength()}
+        if nProc is not None:
+            bounds['work'] = np.sum(taskPool.costs) / nProc
+        return bounds
+
     def getRuntime(self) -> float:
         """
         Returns the runtime of a schedule
@@ -259,3 +411,74 @@ def getSchedule(taskPool: TaskPool, nProc: int, nPoints: int, schedulerType: str
     scheduler = SchedulerClass(taskPool=taskPool, nProc=nProc, nPoints=nPoints)
     scheduler.computeSchedule()
     return scheduler
+
+
+def getLowerBound(taskPool: TaskPool, nProc: int, nPoints: int, schedulerType: str) -> float:
+    """
+    Helper function to get a lower bound for the runtime of a schedule,
+    without computing the schedule
+
+    Parameters
+    ----------
+    taskPool : TaskPool
+        Task pool containing all tasks to be scheduled
+    nProc: int, None
+        Number of procs
+    nPoints: int
+        Number of blocks
+    schedulerType: str
+        Name of the scheduler
+
+    Returns
+    -------
+    bound : float
+        The largest lower bound of the scheduler (see Scheduler.getLowerBounds)
+    """
+    SchedulerClass = SCHEDULER[schedulerType]
+    nProc = SchedulerClass.getDefaultNProc(nPoints - 1) if nProc is None else nProc
+    return max(SchedulerClass.getLowerBounds(taskPool=taskPool, nProc=nProc, nPoints=nPoints).values())
+
+
+def getSchedules(taskPool: TaskPool, nProcList: list, nPoints: int, schedulerType: str,
+                 maxRuntime: float = None) -> np.ndarray:
+    """
+    Helper function to compute the schedule runtime for several numbers of
+    processes. The scheduler is created only once, such that data depending
+    only on the task pool (e.g. task priorities) is shared between schedules.
+
+    Parameters
+    ----------
+    taskPool : TaskPool
+        Task pool containing all tasks to be scheduled
+    nProcList: list
+        Numbers of procs, None values are replaced by the scheduler default
+    nPoints: int
+        Number of blocks
+    schedulerType: str
+        Name of the scheduler
+    maxRuntime: float, None
+        If given, numbers of procs for which the lower bound of the runtime
+        is larger are not scheduled, and their runtime is set to infinity
+
+    Returns
+    -------
+    runtimes : np.ndarray
+        Runtime of the schedule for each number of procs
+    """
+    SchedulerClass = SCHEDULER[schedulerType]
+    scheduler = None
+    runtimes = np.zeros(len(nProcList))
+    for i, nProc in enumerate(nProcList):
+        nProc = SchedulerClass.getDefaultNProc(nPoints - 1) if nProc is None else nProc
+        if maxRuntime is not None:
+            bounds = SchedulerClass.getLowerBounds(taskPool=taskPool, nProc=nProc, nPoints=nPoints)
+            if max(bounds.values()) > maxRuntime:
+                runtimes[i] = np.inf
+                continue
+        if scheduler is None:
+            scheduler = SchedulerClass(taskPool=taskPool, nProc=nProc, nPoints=nPoints)
+        else:
+            scheduler.reset(nProc)
+        scheduler.computeSchedule()
+        runtimes[i] = scheduler.getRuntime()
+    return runtimes
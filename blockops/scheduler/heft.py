@@ -0,0 +1,127 @@
+from bisect import bisect_right, insort
+
+from blockops.scheduler import register, TaskPool
+from blockops.scheduler.listScheduler import listScheduler
+from blockops.utils.params import setParams
+
+
+@register
+@setParams(
+)
+class HEFT(listScheduler):
+    """
+    Calculates a schedule using a critical-path list approach (HEFT):
+    the available task with the highest upward rank, i.e. the longest path
+    to the end of the computation, is scheduled first. Each task is
+    inserted on the process finishing it the earliest, possibly into an
+    idle interval between two already scheduled tasks.
+    """
+    NAME = "HEFT"
+    IDS = {"HEFT", "CRITICAL-PATH"}
+
+    def __init__(self, taskPool: TaskPool, nProc: int, nPoints: int) -> None:
+        """
+        Constructor for HEFT scheduler
+        """
+        super().__init__(taskPool=taskPool, nProc=nProc, nPoints=nPoints)
+
+    def reset(self, nProc: int) -> None:
+        """
+        Clears the schedule for a given number of processes
+
+        Parameters
+        ----------
+        nProc : int
+            The number of processes
+        """
+        super().reset(nProc)
+
+        # Start and end of the tasks scheduled on each process, sorted by time
+        self.procStarts = [[] for _ in range(self.nProc)]
+        self.procEnds = [[] for _ in range(self.nProc)]
+
+    def getPriorities(self) -> tuple:
+        """
+        Returns the priority of all tasks
+
+        Selects tasks based on the following priotirization:
+            - Highest upward rank first
+
+        Returns
+        -------
+        priorities : tuple
+            Negative upward rank of the tasks
+        """
+        return -self.taskPool.getUpwardRanks(),
+
+    def getInsertionStart(self, proc: int, start: float, cost: float) -> float:
+        """
+        Returns the earliest start of a task on a process, using the first
+        idle interval long enough to execute the task
+
+        Parameters
+        ----------
+        proc : int
+            The process
+        start : float
+            Earliest start of the task given its prerequisites
+        cost : float
+            Cost of the task
+
+        Returns
+        -------
+        start : float
+            Earliest start of the task on the process
+        """
+        starts, ends = self.procStarts[proc], self.procEnds[proc]
+        for i in range(bisect_right(ends, start), len(starts)):
+            if starts[i] >= start + cost:
+                break
+            start = max(start, ends[i])
+        return start
+
+    def assignTask(self, taskId: int) -> None:
+        """
+        Computes the process finishing the task *taskId* the earliest, and
+        the corresponding starting point.
+
+        Parameters
+        ----------
+        taskId : int
+            The id of the task to be scheduled
+        """
+        minimal_start_time = self.getEarliestStart(taskId)
+        cost = self.costs[taskId]
+
+        bestProc, bestStart = None, None
+        for proc in range(self.nProc):
+            start = self.getInsertionStart(proc, minimal_start_time, cost)
+            if bestStart is None or start < bestStart:
+                bestProc, bestStart = proc, start
+                # No process can start the task earlier
+                if start == minimal_start_time:
+                    break
+
+        # Tasks without cost do not occupy the process
+        if cost > 0:
+            insort(self.procStarts[bestProc], bestStart)
+            insort(self.procEnds[bestProc], bestStart + cost)
+        self.addToSchedule(taskId=taskId, proc=bestProc, start=bestStart)
+
+    @staticmethod
+    def getDefaultNProc(N: int) -> int:
+        """
+        Returns the standard choice of processes for this scheduler
+        based on the number of blocks
+
+        Parameters
+        ----------
+        N : int
+            Number of blocks
+
+        Returns
+        -------
+        N : int
+            One process per block
+        """
+        return N
@@ -1,7 +1,8 @@
-import sympy as sy
+import heapq
+import numpy as np
 from abc import ABC, abstractmethod
 
-from blockops.scheduler import Scheduler, TaskPool
+from blockops.scheduler import Scheduler, ScheduledTask, TaskPool
 from blockops.utils.params import setParams
 
 @setParams(
@@ -20,58 +21,124 @@ class listScheduler(Scheduler, ABC):
         """
         super().__init__(taskPool=taskPool, nProc=nProc, nPoints=nPoints)
 
-        # Use three list to divide tasks:
-        #   - availableTasks: All prerequisites are fulfilled
-        #   - notAvailableTasks: At least one prerequisite is not fulfilled
-        #   - finishedTasks: Finished tasks
-        self.availableTasks = set([key for key, value in self.taskPool.pool.items() if len(value.dep) == 0])
-        self.notAvailableTasks = set([key for key, value in self.taskPool.pool.items() if len(value.dep) > 0])
-        self.finishedTasks = set([])
+        # Tasks are identified by their id in the task pool, the dependency
+        # graph is copied into lists for fast access to single tasks
+        self.depPtr, self.depIdx = self.taskPool.depPtr.tolist(), self.taskPool.depIdx.tolist()
+        self.sucPtr, self.sucIdx = self.taskPool.sucPtr.tolist(), self.taskPool.sucIdx.tolist()
+        self.costs = self.taskPool.costs.tolist()
+
+        # Priority of each task, ties are broken by task id
+        self.priorities = list(zip(*(column.tolist() for column in self.getPriorities()),
+                                   range(self.taskPool.nTasks)))
+
+    def initLists(self) -> None:
+        """
+        Initializes the dependency counters and the priority queue of the
+        available tasks before computing a schedule
+        """
+        # Number of unfinished prerequisites of each task
+        self.remainingDeps = np.diff(self.taskPool.depPtr)
+
+        # End of each scheduled task
+        self.taskEnd = np.zeros(self.taskPool.nTasks)
+
+        self.readyQueue = [self.priorities[item] for item in np.flatnonzero(self.remainingDeps == 0).tolist()]
+        heapq.heapify(self.readyQueue)
 
     @abstractmethod
-    def pickTask(self):
+    def getPriorities(self) -> tuple:
         """
         Abstract method
-        Contains logic to pick the next task to schedule.
+        Returns the priority of all tasks, as a tuple of arrays compared
+        lexicographically. The available task with the lowest priority is
+        scheduled next.
         """
         raise NotImplementedError()
 
+    def pickTask(self) -> int:
+        """
+        Picks the next task to schedule from the priority queue.
+
+        Returns
+        -------
+        taskId : int
+            Id of the task to be scheduled next
+        """
+        return heapq.heappop(self.readyQueue)[-1]
+
     @abstractmethod
-    def assignTask(self, taskName: sy.Symbol) -> None:
+    def assignTask(self, taskId: int) -> None:
         """
         Abstract method for assigning task
 
         Parameters
         ----------
-        taskName : sy.Symbol
-            The name of the task to be scheduled
+        taskId : int
+            The id of the task to be scheduled
         """
         raise NotImplementedError()
 
-    def updateLists(self, taskName: sy.Symbol) -> None:
+    def getEarliestStart(self, taskId: int) -> float:
         """
-        Updates all three lists after task *taskName* is scheduled
+        Returns the time at which all prerequisites of a task are finished
 
         Parameters
         ----------
-        taskName : sy.Symbol
-            The name of the last scheduled task
-        """
-        # Remove task from available task and add to finished
-        self.finishedTasks.add(taskName)
-        self.availableTasks.remove(taskName)
-
-        # Iterating on all following tasks
-        task = self.taskPool.getTask(name=taskName)
-        for item in task.followingTasks:
-            folTask = self.taskPool.getTask(name=item)
-            # Check if all dependencies are finished
-            if sum(el in self.finishedTasks for el in folTask.dep) == len(folTask.dep):
-                # Check if task is not already finished or available
-                if item not in self.finishedTasks and item not in self.availableTasks:
-                    # Add task to available tasks and remove from non available
-                    self.availableTasks.add(item)
-                    self.notAvailableTasks.remove(item)
+        taskId : int
+            The id of the task
+
+        Returns
+        -------
+        start : float
+            Earliest start of the task
+        """
+        return max((self.taskEnd[item] for item in self.depIdx[self.depPtr[taskId]:self.depPtr[taskId + 1]]),
+                   default=0)
+
+    def addToSchedule(self, taskId: int, proc: int, start: float) -> None:
+        """
+        Stores the task *taskId* into the schedule and updates the makespan
+
+        Parameters
+        ----------
+        taskId : int
+            The id of the task
+        proc : int
+            The process executing the task
+        start : float
+            Start of the task
+        """
+        opCode = self.taskPool.opCodes[taskId]
+        end = start + self.costs[taskId]
+        self.schedule[self.taskPool.names[taskId]] = ScheduledTask(proc=proc,
+                                                                   start=start,
+                                                                   end=end,
+                                                                   name=self.taskPool.opTypes[opCode],
+                                                                   color=self.taskPool.colors[opCode])
+        self.taskEnd[taskId] = end
+        # Tasks may be inserted before the last task of the process
+        if end > self.startPointProc[proc]:
+            self.startPointProc[proc] = end
+
+        # Update makespan if required
+        if end > self.makespan:
+            self.makespan = end
+
+    def updateLists(self, taskId: int) -> None:
+        """
+        Releases the following tasks of *taskId* once it is scheduled
+
+        Parameters
+        ----------
+        taskId : int
+            The id of the last scheduled task
+        """
+        remainingDeps = self.remainingDeps
+        for item in self.sucIdx[self.sucPtr[taskId]:self.sucPtr[taskId + 1]]:
+            remainingDeps[item] -= 1
+            # Add the task to the available tasks once all prerequisites are finished
+            if remainingDeps[item] == 0:
+                heapq.heappush(self.readyQueue, self.priorities[item])
 
     def computeSchedule(self) -> None:
         """
@@ -82,9 +149,10 @@ class listScheduler(Scheduler, ABC):
             - Choose one tasks based on logic (see pickTasks)
             - Assign task, i.e. compute the earliest possible start
               on the corresponding process
-            - Update the three lists of tasks
+            - Release the tasks depending on it
         """
-        while len(self.availableTasks) != 0:
-            taskName = self.pickTask()
-            self.assignTask(taskName=taskName)
-            self.updateLists(taskName=taskName)
+        self.initLists()
+        while len(self.readyQueue) != 0:
+            taskId = self.pickTask()
+            self.assignTask(taskId=taskId)
+            self.updateLists(taskId=taskId)
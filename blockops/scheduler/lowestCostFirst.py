@@ -1,7 +1,5 @@
-import numpy as np
-import sympy as sy
 
-from blockops.scheduler import register, ScheduledTask, TaskPool
+from blockops.scheduler import register, ProcessAvailability, TaskPool
 from blockops.scheduler.listScheduler import listScheduler
 from blockops.utils.params import setParams
 
@@ -25,56 +23,50 @@ class LowestCostFirst(listScheduler):
         """
         super().__init__(taskPool=taskPool, nProc=nProc, nPoints=nPoints)
 
-    def pickTask(self) -> sy.Symbol:
+    def reset(self, nProc: int) -> None:
         """
-        Contains logic to pick the next task to schedule.
+        Clears the schedule for a given number of processes
+
+        Parameters
+        ----------
+        nProc : int
+            The number of processes
+        """
+        super().reset(nProc)
+        self.startPointProc = ProcessAvailability(self.nProc)
+
+    def getPriorities(self) -> tuple:
+        """
+        Returns the priority of all tasks
 
         Selects tasks based on the following priotirization:
             - Task with lowest costs
+            - Earliest iteration first
+            - Earliest time first
 
         Returns
         -------
-        taskName : sy.Symbol
-            Name of the task to be scheduled next
+        priorities : tuple
+            Cost, iteration and block of the tasks
         """
-        tmp = [[self.taskPool.getTask(item).cost,
-                self.taskPool.getTask(item).iteration,
-                self.taskPool.getTask(item).block, item] for item in self.availableTasks]
-        return min(tmp, key=lambda x: (x[0], x[1], x[2]))[3]
+        return self.taskPool.costs, self.taskPool.iterations, self.taskPool.blocks
 
-    def assignTask(self, taskName: sy.Symbol) -> None:
+    def assignTask(self, taskId: int) -> None:
         """
-        Computes the earliest starting point for the task *taskName*.
-        The starting point depends on the prerequisite tasks of *taskName*.
+        Computes the earliest starting point for the task *taskId*.
+        The starting point depends on the prerequisite tasks of *taskId*.
 
         Parameters
         ----------
-        taskName : sy.Symbol
-            The name of the task to be scheduled
+        taskId : int
+            The id of the task to be scheduled
         """
-        # Get task
-        task = self.taskPool.getTask(taskName)
-
         # Compute the minimum start time based on the prerequisites
-        minimal_start_time = 0
-        for depTask in task.dep:
-            if self.schedule[depTask].end > minimal_start_time:
-                minimal_start_time = self.schedule[depTask].end
+        minimal_start_time = self.getEarliestStart(taskId)
 
         # Get the first process who is free for the minimal start time
-        tmp = np.where(self.startPointProc <= minimal_start_time)[0]
-        if len(tmp) > 0:
-            proc = tmp[0]
-        else:
-            proc = np.argmin(self.startPointProc)
+        proc = self.startPointProc.first(minimal_start_time)
+        if proc is None:
+            proc = self.startPointProc.earliest()
             minimal_start_time = self.startPointProc[proc]
-        self.schedule[taskName] = ScheduledTask(proc=proc,
-                                                start=minimal_start_time,
-                                                end=minimal_start_time + task.cost,
-                                                name=task.opType,
-                                                color=task.color)
-        self.startPointProc[proc] = self.schedule[taskName].end
-
-        # Update minimum runtime if required
-        if self.schedule[taskName].end > self.makespan:
-            self.makespan = self.schedule[taskName].end
+        self.addToSchedule(taskId=taskId, proc=proc, start=minimal_start_time)
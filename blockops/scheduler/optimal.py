@@ -1,7 +1,6 @@
 import numpy as np
-import sympy as sy
 
-from blockops.scheduler import register, ScheduledTask, TaskPool
+from blockops.scheduler import register, ProcessAvailability, TaskPool
 from blockops.scheduler.listScheduler import listScheduler
 from blockops.utils.params import setParams
 
@@ -22,44 +21,66 @@ class Optimal(listScheduler):
         Constructor for optimal scheduler
         """
         super().__init__(taskPool=taskPool, nProc=nProc, nPoints=nPoints)
-        self.startPointProc = np.zeros(20000)
 
-    def pickTask(self) -> sy.Symbol:
+    def reset(self, nProc: int) -> None:
         """
-        Contains logic to pick the next task to schedule
+        Clears the schedule, the number of processes is not used
+
+        Parameters
+        ----------
+        nProc : int
+            The number of processes
+        """
+        super().reset(nProc)
+        self.startPointProc = ProcessAvailability(0)  # Processes are added when needed
+
+    @classmethod
+    def getLowerBounds(cls, taskPool: TaskPool, nProc: int, nPoints: int) -> dict:
+        """
+        Returns lower bounds for the runtime of a schedule, the number of
+        processes is not limited
+
+        Parameters
+        ----------
+        taskPool : TaskPool
+            Task pool containing all tasks to be scheduled
+        nProc : int
+            The number of processes, not used
+        nPoints : int
+            The number of blocks
+
+        Returns
+        -------
+        bounds : dict
+            The critical path bound
+        """
+        return super().getLowerBounds(taskPool=taskPool, nProc=None, nPoints=nPoints)
+
+    def getPriorities(self) -> tuple:
+        """
+        Returns the priority of all tasks
 
         Choose the cheapest task (Typically corresponds to
         coarse solves that often allow new tasks)
-        Random choices are possible
 
         Returns
         -------
-        taskName : sy.Symbol
-            Name of the task to be scheduled next
+        priorities : tuple
+            Cost of the tasks
         """
-        tmp = [[self.taskPool.getTask(item).cost, item] for item in self.availableTasks]
-        return min(tmp, key=lambda x: x[0])[1]
+        return self.taskPool.costs,
 
-    def assignTask(self, taskName):
+    def assignTask(self, taskId: int) -> None:
         """
-        Computes the earliest starting point for the task *taskName*.
+        Computes the earliest starting point for the task *taskId*.
         Assigns the task to process as soon as possible
         """
-        task = self.taskPool.getTask(taskName)
-        minimal_start_time = 0
-        for depTask in task.dep:
-            if self.schedule[depTask].end > minimal_start_time:
-                minimal_start_time = self.schedule[depTask].end
-        # Get the first process who is free for the minimal start time
-        proc = next(x[0] for x in enumerate(self.startPointProc) if x[1] <= minimal_start_time)
-        self.schedule[taskName] = ScheduledTask(proc=proc,
-                                                start=minimal_start_time,
-                                                end=minimal_start_time + task.cost,
-                                                name=task.opType,
-                                                color=task.color)
-        self.startPointProc[proc] = self.schedule[taskName].end
-        if self.schedule[taskName].end > self.makespan:
-            self.makespan = self.schedule[taskName].end
+        minimal_start_time = self.getEarliestStart(taskId)
+        # Get the first process who is free for the minimal start time, or a new one
+        proc = self.startPointProc.first(minimal_start_time)
+        if proc is None:
+            proc = self.startPointProc.addProcess()
+        self.addToSchedule(taskId=taskId, proc=proc, start=minimal_start_time)
 
     def computeSchedule(self):
         """
@@ -67,4 +88,4 @@ class Optimal(listScheduler):
         Calls the parent function and updates the number of processes used
         """
         super(Optimal, self).computeSchedule()
-        self.nProc = len(np.where(self.startPointProc != 0)[0])
+        self.nProc = len(np.where(self.startPointProc.times != 0)[0])
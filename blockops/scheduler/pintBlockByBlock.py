@@ -1,7 +1,6 @@
 import numpy as np
-import sympy as sy
 
-from blockops.scheduler import register, ScheduledTask, TaskPool
+from blockops.scheduler import register, TaskPool
 from blockops.scheduler.listScheduler import listScheduler
 from blockops.utils.params import setParams
 
@@ -23,9 +22,19 @@ class PinTBlockByBlock(listScheduler):
         """
         super().__init__(taskPool=taskPool, nProc=nProc, nPoints=nPoints)
 
+    def reset(self, nProc: int) -> None:
+        """
+        Clears the schedule and distributes the blocks on the processes
+
+        Parameters
+        ----------
+        nProc : int
+            The number of processes
+        """
+        super().reset(nProc)
+
         # Compute which time points are located on which process
-        self.distribution = np.array([int(self.nPoints / self.nProc + 1)] * (self.nPoints % self.nProc) +
-                                     [int(self.nPoints / self.nProc)] * (self.nProc - self.nPoints % self.nProc))
+        self.distribution = self.getDistribution(nProc=self.nProc, nPoints=self.nPoints)
         self.pointToProc = {}
         start = 0
         for i in range(self.nProc):
@@ -33,9 +42,56 @@ class PinTBlockByBlock(listScheduler):
                 self.pointToProc[j] = i
             start += self.distribution[i]
 
-    def pickTask(self) -> sy.Symbol:
+    @staticmethod
+    def getDistribution(nProc: int, nPoints: int) -> np.ndarray:
+        """
+        Returns the number of consecutive time points located on each process
+
+        Parameters
+        ----------
+        nProc : int
+            The number of processes
+        nPoints : int
+            The number of blocks
+
+        Returns
+        -------
+        distribution : np.ndarray
+            Number of time points of each process
         """
-        Contains logic to pick the next task to schedule.
+        return np.array([int(nPoints / nProc + 1)] * (nPoints % nProc) +
+                        [int(nPoints / nProc)] * (nProc - nPoints % nProc))
+
+    @classmethod
+    def getLowerBounds(cls, taskPool: TaskPool, nProc: int, nPoints: int) -> dict:
+        """
+        Returns lower bounds for the runtime of a schedule. Since all tasks
+        of a time point are computed by the same process, the runtime is at
+        least the total cost of the tasks on the most loaded process.
+
+        Parameters
+        ----------
+        taskPool : TaskPool
+            Task pool containing all tasks to be scheduled
+        nProc : int
+            The number of processes
+        nPoints : int
+            The number of blocks
+
+        Returns
+        -------
+        bounds : dict
+            The bounds of the parent class, and with the key blocks the
+            bound from the serial computation of the blocks on each process
+        """
+        bounds = super().getLowerBounds(taskPool=taskPool, nProc=nProc, nPoints=nPoints)
+        pointToProc = np.repeat(np.arange(nProc), cls.getDistribution(nProc=nProc, nPoints=nPoints))
+        bounds['blocks'] = np.bincount(pointToProc[taskPool.blocks], weights=taskPool.costs).max()
+        return bounds
+
+    def getPriorities(self) -> tuple:
+        """
+        Returns the priority of all tasks
 
         Selects tasks based on the following priotirization:
             - Earliest iteration first
@@ -43,67 +99,28 @@ class PinTBlockByBlock(listScheduler):
 
         Returns
         -------
-        taskName : sy.Symbol
-            Name of the task to be scheduled next
+        priorities : tuple
+            Iteration and negative block of the tasks
         """
+        return self.taskPool.iterations, -self.taskPool.blocks
 
-        # Pick the first task
-        taskName = next(iter(self.availableTasks))
-        task = self.taskPool.getTask(name=taskName)
-        tmpIt = task.iteration
-        tmpB = task.block
-
-        # Iterates over all tasks and checks if another task has higher priority
-        for item in self.availableTasks:
-            tmp = self.taskPool.getTask(name=item)
-            if tmp.iteration < tmpIt:
-                taskName = item
-                task = tmp
-                tmpIt = task.iteration
-                tmpB = task.block
-            elif tmp.iteration == tmpIt:
-                if tmp.block > tmpB:
-                    taskName = item
-                    task = tmp
-                    tmpIt = task.iteration
-                    tmpB = task.block
-            else:
-                continue
-        return taskName
-
-    def assignTask(self, taskName: sy.Symbol) -> None:
+    def assignTask(self, taskId: int) -> None:
         """
-        Computes the earliest starting point for the task *taskName*.
-        The starting point depends on the prerequisite tasks of *taskName*
+        Computes the earliest starting point for the task *taskId*.
+        The starting point depends on the prerequisite tasks of *taskId*
         and the process associated with the task
 
         Parameters
         ----------
-        taskName : sy.Symbol
-            The name of the task to be scheduled
+        taskId : int
+            The id of the task to be scheduled
         """
-
-        # Get task object
-        task = self.taskPool.getTask(taskName)
+        proc = self.pointToProc[self.taskPool.blocks[taskId]]
 
         # Compute earliest start point
-        possibleStartTime = self.startPointProc[self.pointToProc[task.block]]
-        tmp_commu = 0
-        for depTask in task.dep:
-            if self.schedule[depTask].end + tmp_commu > possibleStartTime:
-                possibleStartTime = self.schedule[depTask].end + tmp_commu
-
-        self.schedule[taskName] = ScheduledTask(proc=self.pointToProc[task.block],
-                                                start=possibleStartTime,
-                                                end=possibleStartTime + task.cost,
-                                                name=task.opType,
-                                                color=task.color)
-
-        self.startPointProc[self.pointToProc[task.block]] = self.schedule[taskName].end
-
-        # Update makespan if required
-        if self.schedule[taskName].end > self.makespan:
-            self.makespan = self.schedule[taskName].end
+        possibleStartTime = max(self.startPointProc[proc], self.getEarliestStart(taskId))
+
+        self.addToSchedule(taskId=taskId, proc=proc, start=possibleStartTime)
 
     @staticmethod
     def getDefaultNProc(N: int) -> int:
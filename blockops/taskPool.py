@@ -1,7 +1,8 @@
+import numpy as np
 import sympy as sy
-import re
 import warnings
 import time
+from collections.abc import Mapping
 
 from blockops.run import PintRun
 
@@ -24,77 +25,304 @@ class Counter(object):
         return str(self.n)
 
 
+def gatherSegments(ptr: np.ndarray, idx: np.ndarray, ids: np.ndarray) -> tuple:
+    """
+    Gathers the entries of several rows of a CSR layout
+
+    Parameters
+    ----------
+    ptr : np.ndarray
+        Row pointers of the layout
+    idx : np.ndarray
+        Entries of the layout
+    ids : np.ndarray
+        The rows to gather
+
+    Returns
+    -------
+    owners : np.ndarray
+        Row of each gathered entry
+    entries : np.ndarray
+        The gathered entries
+    """
+    counts = ptr[ids + 1] - ptr[ids]
+    owners = np.repeat(ids, counts)
+    offsets = np.repeat(ptr[ids] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    return owners, idx[offsets]
+
+
+def getOpType(op) -> str:
+    """
+    Returns the string representing the type of an operation
+
+    Parameters
+    ----------
+    op : sy.Expr, str
+        Operation of a task
+
+    Returns
+    -------
+    opType : str
+        Operation as (latex) string
+    """
+    opType = f'${str(op).replace("(-1)", "{-1}").replace("**", "^")}$'
+    if opType.startswith("$-"):
+        opType = "$" + opType[2:]
+    return opType
+
+
 class Task(object):
-    """Represents one task"""
+    """
+    View on one task of a task pool.
+
+    The data of all tasks is stored in the arrays of the TaskPool, a view
+    only holds the pool and the integer id of the task.
+    """
 
-    def __init__(self, op: sy.Expr, result: sy.Expr, cost: float, dep: list, n: int, k: int, fullOp: sy.Expr) -> None:
+    __slots__ = ('pool', 'id')
+
+    def __init__(self, pool, id: int) -> None:
         """
-        Creates a task based.
+        Creates a view on a task.
 
         Parameters
         ----------
-        op : sy.Expr
-            DESCRIPTION. Represents the expression that the task performs.
-        result : sy.Expr
-            DESCRIPTION. A representation for the result of the expression
-        cost : float
-            The cost of this task
-        dep : sy.Add, sy.Symbol, sy.Mul, None
-            Expression representing the dependencies of this task
-        n : int
-            The block associated with this task
-        k : int
-            The iteration associated with this task
-        fullOp : sy.Expr
-            Full operation
-
-        """
-        self.op = op  # Operation (sympy expression)
-        self.result = result  # Result (what is computed by this task)
-        self.cost = cost  # Costs
-        self.color = "gray"  # Default color
-        self.fullOP = fullOp  # Full operation
-
-        # Set dependencies
-        self.dep = []
-        if type(dep) == sy.Add:
-            for item in dep.args:
-                if type(item) == sy.Mul:
-                    if type(item.args[0]) == sy.core.numbers.NegativeOne or type(item.args[0]) == sy.Integer:
-                        self.dep.append(item.args[1])
-                    else:
-                        raise Exception(f'Unknwon first argument in task {type(item.args[0])}')
-                else:
-                    self.dep.append(item)
-        elif type(dep) == sy.Symbol:
-            self.dep = [dep]
-        elif type(dep) == sy.Mul:
-            for item in dep.args:
-                if type(item) == sy.Symbol:
-                    self.dep.append(item)
-        elif dep is None:
-            self.dep = []
-        else:
-            raise Exception(f'Unknown type of dependency: {type(self.dep)}')
-
-        # Helper to know about parent and following tasks
-        self.parent = None
-        self.followingTasks = []
+        pool : TaskPool
+            The pool containing the task
+        id : int
+            The integer id of the task in the pool
+        """
+        self.pool = pool
+        self.id = id
 
-        # Iteration and block
-        self.iteration = k
-        self.block = n
+    @property
+    def op(self):
+        """Expression that the task performs"""
+        return self.pool.ops[self.id]
+
+    @property
+    def result(self) -> sy.Symbol:
+        """Representation for the result of the task (its name)"""
+        return self.pool.names[self.id]
+
+    @property
+    def fullOP(self) -> sy.Expr:
+        """Full operation"""
+        return self.pool.getFullOp(self.id)
+
+    @property
+    def cost(self) -> float:
+        """Cost of the task"""
+        return self.pool.costs[self.id]
+
+    @property
+    def block(self) -> int:
+        """Block associated with the task"""
+        return int(self.pool.blocks[self.id])
+
+    @property
+    def iteration(self) -> int:
+        """Iteration associated with the task"""
+        return int(self.pool.iterations[self.id])
+
+    @property
+    def type(self) -> str:
+        """Type of operation (main == full block operation, sub == subtask for a block iteration)"""
+        return 'main' if self.pool.isMain[self.id] else 'sub'
+
+    @property
+    def opType(self) -> str:
+        """Operation as string"""
+        return self.pool.opTypes[self.pool.opCodes[self.id]]
+
+    @property
+    def color(self) -> str:
+        """Color associated with the type of operation"""
+        return self.pool.colors[self.pool.opCodes[self.id]]
+
+    @property
+    def dep(self) -> list:
+        """Names of the tasks this task depends on"""
+        return [self.pool.names[i] for i in self.pool.getDependencies(self.id)]
+
+    @property
+    def followingTasks(self) -> list:
+        """Names of the tasks depending on this task"""
+        return [self.pool.names[i] for i in self.pool.getSuccessors(self.id)]
+
+
+class TaskMap(Mapping):
+    """Read-only mapping from task names to task views, in creation order"""
+
+    __slots__ = ('pool',)
+
+    def __init__(self, pool) -> None:
+        self.pool = pool
+
+    def __getitem__(self, name: sy.Symbol) -> Task:
+        return Task(self.pool, self.pool.ids[name])
+
+    def __iter__(self):
+        return iter(self.pool.names)
+
+    def __len__(self) -> int:
+        return len(self.pool.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self.pool.ids
+
+
+class ExpressionTable(object):
+    """
+    Hash-consing table for the expressions computed by the tasks.
+
+    Each expression is described by a handle (exprId, sign, key):
+
+    - exprId identifies how the expression is computed (a symbol, the
+      product of an operator and an expression, or the sum of two
+      expressions). The SymPy expression is only built on request, see
+      getExpression.
+    - key identifies the expression up to its sign, and is computed from
+      the keys of the operands. Two expressions that are equal up to the
+      sign have the same key, hence duplicate tasks are found without
+      SymPy arithmetic.
+
+    Keys are based on a canonical form of the expressions, i.e. a sum of
+    terms (coefficient times a product of factors). Adjacent powers of the
+    same factor are combined like in SymPy products.
+    """
+
+    def __init__(self) -> None:
+        self.exprs = []  # How each expression is computed
+        self.exprIds = {}  # Id of each expression
+        self.values = {}  # SymPy expressions already built
+        self.ops = []  # Interned operators
+        self.opIds = {}  # Id of each operator
+        self.opForms = []  # Coefficient and factors of each operator
+        self.bases = {}  # Id of each factor base (symbol or sum)
+        self.forms = []  # Canonical form of each key
+        self.keys = {}  # Key of each canonical form
+        self.products = {}  # Keys of the products already computed
+        self.sums = {}  # Keys of the sums already computed
+        self.zero = self.getKey(())
+
+    def intern(self, expr: tuple) -> int:
+        """Returns the id of an expression"""
+        exprId = self.exprIds.get(expr)
+        if exprId is None:
+            exprId = self.exprIds[expr] = len(self.exprs)
+            self.exprs.append(expr)
+        return exprId
+
+    def getKey(self, form: tuple) -> int:
+        """Returns the key of a canonical form"""
+        key = self.keys.get(form)
+        if key is None:
+            key = self.keys[form] = len(self.forms)
+            self.forms.append(form)
+        return key
+
+    def getBase(self, base) -> int:
+        """Returns the id of a factor base"""
+        baseId = self.bases.get(base)
+        if baseId is None:
+            baseId = self.bases[base] = len(self.bases)
+        return baseId
+
+    def normalize(self, terms: dict) -> tuple:
+        """Returns the sign and the key of a sum of terms {factors: coefficient}"""
+        form = tuple(sorted((factors, coeff) for factors, coeff in terms.items() if coeff != 0))
+        if form and form[0][1] < 0:
+            return -1, self.getKey(tuple((factors, -coeff) for factors, coeff in form))
+        return 1, self.getKey(form)
+
+    @staticmethod
+    def merge(left: tuple, right: tuple) -> tuple:
+        """Returns the product of two products of factors (baseId, exponent)"""
+        while left and right and left[-1][0] == right[0][0]:
+            exponent = left[-1][1] + right[0][1]
+            if exponent != 0:
+                return left[:-1] + ((left[-1][0], exponent),) + right[1:]
+            left, right = left[:-1], right[1:]
+        return left + right
+
+    def getOpId(self, op) -> int:
+        """Returns the id of an operator"""
+        opId = self.opIds.get(op)
+        if opId is None:
+            opId = self.opIds[op] = len(self.ops)
+            self.ops.append(op)
+            if type(op) == sy.core.numbers.Zero:
+                self.opForms.append((0, ()))
+            else:
+                coeffs, factors = op.args_cnc()
+                coeff = 1
+                for item in coeffs:
+                    coeff = coeff * (int(item) if type(item) in (sy.Integer, sy.core.numbers.NegativeOne,
+                                                                  sy.core.numbers.One) else item)
+                factors = tuple((self.getBase(f.base), int(f.exp)) if type(f) == sy.Pow and f.exp.is_Integer
+                                else (self.getBase(f), 1) for f in factors)
+                self.opForms.append((coeff, self.merge((), factors)))
+        return opId
+
+    def symbol(self, symbol: sy.Symbol) -> tuple:
+        """Returns the handle of a symbol"""
+        return self.intern(('sym', symbol)), 1, self.getKey(((((self.getBase(symbol), 1),), 1),))
+
+    def mul(self, op, handle: tuple) -> tuple:
+        """Returns the handle of op * expression"""
+        exprId, sign, key = handle
+        opId = self.getOpId(op)
+        if (opId, key) not in self.products:
+            coeff, factors = self.opForms[opId]
+            form = self.forms[key]
+            if coeff == 0 or len(form) == 0:
+                terms = {}
+            elif len(factors) == 0:
+                terms = {f: coeff * c for f, c in form}
+            elif len(form) == 1:
+                terms = {self.merge(factors, form[0][0]): coeff * form[0][1]}
+            else:
+                terms = {self.merge(factors, ((self.getBase(('sum', key)), 1),)): coeff}
+            self.products[(opId, key)] = self.normalize(terms)
+        newSign, newKey = self.products[(opId, key)]
+        return self.intern(('mul', opId, exprId)), sign * newSign, newKey
+
+    def add(self, left: tuple, right: tuple) -> tuple:
+        """Returns the handle of left + right"""
+        sumKey = (left[1] * right[1], left[2], right[2])
+        if sumKey not in self.sums:
+            terms = dict(self.forms[left[2]])
+            for factors, coeff in self.forms[right[2]]:
+                terms[factors] = terms.get(factors, 0) + sumKey[0] * coeff
+            self.sums[sumKey] = self.normalize(terms)
+        newSign, newKey = self.sums[sumKey]
+        return self.intern(('add', left[0], right[0])), left[1] * newSign, newKey
+
+    def getExpression(self, exprId: int) -> sy.Expr:
+        """
+        Builds the SymPy expression of an expression id.
 
-        # Type of operation (main == full block operation, sub == subtask for a block iteration)
-        if len(re.split('_|\^', result.name)) == 3:
-            self.type = 'main'
-        else:
-            self.type = 'sub'
+        Parameters
+        ----------
+        exprId : int
+            Id of the expression
 
-        # Operation as string
-        self.opType = f'${str(op).replace("(-1)", "{-1}").replace("**", "^")}$'
-        if self.opType.startswith("$-"):
-            self.opType = "$" + self.opType[2:]
+        Returns
+        -------
+        res : sy.Expr
+            The expression
+        """
+        if exprId not in self.values:
+            expr = self.exprs[exprId]
+            if expr[0] == 'sym':
+                res = expr[1]
+            elif expr[0] == 'mul':
+                res = self.ops[expr[1]] * self.getExpression(expr[2])
+            else:
+                res = self.getExpression(expr[1]) + self.getExpression(expr[2])
+            self.values[exprId] = res
+        return self.values[exprId]
 
 
 class TaskPool(object):
@@ -111,21 +339,55 @@ class TaskPool(object):
         """
         self.counter = Counter()  # Helper to assign unique task numbers
         self.results = {}  # Helper to store result of each task
-        self.pool = {}  # Actual task pool
+        self.names = []  # Name (result symbol) of each task, the index being the task id
+        self.ids = {}  # Task id of each name
+        self.ops = []  # Operation of each task
+        self.fullOps = []  # Expression id of the full operation of each task
+        self.expressions = ExpressionTable()  # Expressions computed by the tasks
+        self.costs = []  # Cost of each task
+        self.blocks = []  # Block of each task
+        self.iterations = []  # Iteration of each task
+        self.isMain = []  # Whether the task is a main task (full block operation)
+        self.opCodes = []  # Code of the operation type of each task
+        self.opTypes = []  # Operation type (string) of each code
+        self.colors = []  # Color of each code
+        self.opCodeLookup = {}  # Code of each operation type
+        self.opCodeOfOp = {}  # Code of each operation
+        self.depLists = []  # Dependencies of each task, while the pool is created
+        self.sucLists = []  # Successors of each task, while the pool is created
+        self.depPtr, self.depIdx = None, None  # Dependencies in CSR layout
+        self.sucPtr, self.sucIdx = None, None  # Successors in CSR layout
+        self.pool = TaskMap(self)  # Actual task pool, as mapping from names to tasks
         self.colorLookup = {
             '$IC$': 'lightgrey'}  # Lookup table to assign the same color to task with the same operation
         self.colorCounter = 0  # Helper to identify unused colors
-        self.highestLevelStorage = []  # Helper to set dependencies on highest expression level
+        self.highestLevelStorage = []  # Helper to store the full operation on highest expression level
         self.blockIteration = run.blockIteration  # Block iteration
         self.facBlockRules = run.facBlockRules  # factorized block rules
         self.maxIter = 0  # Maximum iteration number
-
-        # Create tasks from factorized block rules
+        self.templates = getattr(run, 'templates', {})  # Generated rules and the rule they are shifted from
+        self.anchors = set(self.templates.values())  # Rules from which generated rules are shifted
+        self.ruleKeys = {value['result']: key for key, value in self.facBlockRules.items()}  # Rule of each result
+        self.mainIds = {}  # Id of the main task of each rule
+        self.inputs = {}  # Handle of the result of each rule, used as input of other rules
+        self.programs = {}  # Compiled factorized rule of the anchor rules
+        self.opCosts = {}  # Cost of each operator
+        self.upwardRanks = None  # Upward rank of each task, computed on first use
+        self.criticalPathLength = None  # Cost of the critical path, computed on first use
+
+        # Create tasks from factorized block rules, the generated rules are
+        # obtained by shifting the compiled anchor rule
         for key, value in self.facBlockRules.items():
-            self.taskGenerator(rule=value['rule'], res=value['result'], n=key[0], k=key[1])
+            anchor = self.templates.get(key)
+            if anchor in self.programs:
+                self.instantiate(self.programs[anchor], dn=key[0] - anchor[0], n=key[0], k=key[1],
+                                 res=value['result'])
+                self.mainIds[key] = len(self.names) - 1
+            else:
+                self.taskGenerator(rule=value['rule'], res=value['result'], n=key[0], k=key[1])
 
-        # Simplify taskpool by removing task representing identity
-        self.removeTasksRepresentingOne()
+        # Store the tasks into arrays
+        self.compact()
 
     def taskGenerator(self, rule, res: sy.Symbol, n: int, k: int) -> None:
         """
@@ -145,13 +407,17 @@ class TaskPool(object):
 
         # If rule is just a copy of another task
         if type(rule) == dict:
-            self.createTasks(dico=rule, n=n, k=k, res=res)
+            program = self.compileRule(dico=rule)
+            if (n, k) in self.anchors:
+                self.programs[(n, k)] = program
+            self.instantiate(program, dn=0, n=n, k=k, res=res)
         elif type(rule) == sy.core.numbers.Zero:
-            self.addTask(ope=sy.core.numbers.Zero(), inp=sy.core.numbers.Zero(), dep=None, n=n, k=k, result=res)
+            self.addTask(ope=sy.core.numbers.Zero(), inp=self.getZero(), dep=[], n=n, k=k, result=res)
         elif rule is None:
-            pass
+            return
         else:
             raise Exception(f'Unknown type of rule in task generator: {type(rule)}')
+        self.mainIds[(n, k)] = len(self.names) - 1
 
     def getColor(self, op: str) -> str:
         """
@@ -192,22 +458,218 @@ class TaskPool(object):
         res : Task
             The task object
         """
-        return self.pool[name]
+        return Task(self, self.ids[name])
+
+    @property
+    def nTasks(self) -> int:
+        """Number of tasks in the pool"""
+        return len(self.names)
+
+    def getDependencies(self, taskId: int) -> np.ndarray:
+        """
+        Returns the ids of the tasks a task depends on
+
+        Parameters
+        ----------
+        taskId : int
+            Id of the task
+
+        Returns
+        -------
+        res : np.ndarray
+            Ids of the dependencies
+        """
+        return self.depIdx[self.depPtr[taskId]:self.depPtr[taskId + 1]]
+
+    def getSuccessors(self, taskId: int) -> np.ndarray:
+        """
+        Returns the ids of the tasks depending on a task
+
+        Parameters
+        ----------
+        taskId : int
+            Id of the task
+
+        Returns
+        -------
+        res : np.ndarray
+            Ids of the successors
+        """
+        return self.sucIdx[self.sucPtr[taskId]:self.sucPtr[taskId + 1]]
 
-    def addTask(self, ope, inp, dep, n, k, result=None):
+    def getLongestPaths(self, upward: bool = True) -> np.ndarray:
+        """
+        Returns the cost of the longest path from each task (included) to
+        the end of the computation, or from the start of the computation to
+        each task (included). The tasks are processed level by level in
+        topological order, each level being treated at once.
+
+        Parameters
+        ----------
+        upward : bool
+            Compute the paths to the end (True) or from the start (False)
+
+        Returns
+        -------
+        lengths : np.ndarray
+            Length of the longest path of each task
+        """
+        if upward:
+            ptr, idx, otherPtr = self.depPtr, self.depIdx, self.sucPtr
+        else:
+            ptr, idx, otherPtr = self.sucPtr, self.sucIdx, self.depPtr
+        lengths = np.zeros(self.nTasks)
+        remaining = np.diff(otherPtr)
+        level = np.flatnonzero(remaining == 0)
+        while level.size > 0:
+            lengths[level] += self.costs[level]
+            owners, following = gatherSegments(ptr, idx, level)
+            # Longest path through the processed tasks, stored until the task is processed
+            np.maximum.at(lengths, following, lengths[owners])
+            np.subtract.at(remaining, following, 1)
+            following = np.unique(following)
+            level = following[remaining[following] == 0]
+        return lengths
+
+    def getUpwardRanks(self) -> np.ndarray:
+        """
+        Returns the upward rank of all tasks, i.e. the cost of the longest
+        path from each task (included) to the end of the computation.
+
+        Returns
+        -------
+        ranks : np.ndarray
+            Upward rank of each task (read-only, computed once per pool)
+        """
+        if self.upwardRanks is None:
+            self.upwardRanks = self.getLongestPaths(upward=True)
+            self.upwardRanks.flags.writeable = False
+        return self.upwardRanks
+
+    def getCriticalPathLength(self) -> float:
+        """
+        Returns the cost of the critical path, i.e. the longest path in the
+        task graph (computed once per pool)
+
+        Returns
+        -------
+        length : float
+            Cost of the critical path
+        """
+        if self.criticalPathLength is None:
+            ranks = self.getUpwardRanks()
+            self.criticalPathLength = ranks.max() if ranks.size > 0 else 0
+        return self.criticalPathLength
+
+    def getDownwardRanks(self) -> np.ndarray:
+        """
+        Returns the downward rank of all tasks, i.e. the cost of the longest
+        path from the start of the computation to each task (excluded). This
+        is the earliest start of each task with unlimited processes.
+
+        Returns
+        -------
+        ranks : np.ndarray
+            Downward rank of each task
+        """
+        return self.getLongestPaths(upward=False) - self.costs
+
+    def getCriticalPath(self) -> tuple:
+        """
+        Computes the critical path, i.e. the longest path in the task graph
+
+        Returns
+        -------
+        length : float
+            Cost of the critical path
+        path : list
+            Names of the tasks on the critical path
+        slack : np.ndarray
+            Slack of each task, i.e. how much it can be delayed without
+            increasing the length of the critical path
+        """
+        if self.nTasks == 0:
+            return 0, [], np.zeros(0)
+        upward = self.getUpwardRanks()
+        slack = upward.max() - self.getDownwardRanks() - upward
+        taskId = int(np.argmax(upward))
+        length = upward[taskId]
+        path = [self.names[taskId]]
+        following = self.getSuccessors(taskId)
+        while following.size > 0:
+            taskId = following[np.argmax(upward[following])]
+            path.append(self.names[taskId])
+            following = self.getSuccessors(taskId)
+        return length, path, slack
+
+    def getFullOp(self, taskId: int) -> sy.Expr:
+        """
+        Returns the full operation of a task
+
+        Parameters
+        ----------
+        taskId : int
+            Id of the task
+
+        Returns
+        -------
+        res : sy.Expr
+            The full operation
+        """
+        return self.expressions.getExpression(self.fullOps[taskId])
+
+    def getZero(self) -> tuple:
+        """Returns the handle of the zero expression"""
+        return self.expressions.intern(('sym', sy.core.numbers.Zero())), 1, self.expressions.zero
+
+    def getCost(self, ope) -> float:
+        """
+        Returns the cost of an operator
+
+        Parameters
+        ----------
+        ope : sy.Expr
+            The operator
+
+        Returns
+        -------
+        cost : float
+            Cost of the operator
+        """
+        if ope in self.opCosts:
+            return self.opCosts[ope]
+        if type(ope) == sy.Integer or type(ope) == sy.core.numbers.Zero or type(ope) == sy.core.numbers.NegativeOne:
+            cost = 0
+        elif str(ope) in self.blockIteration.blockOps:
+            cost = self.blockIteration.blockOps[str(ope)].cost
+        elif str(ope ** (-1)) in self.blockIteration.blockOps:
+            cost = self.blockIteration.blockOps[str(ope ** (-1))].cost
+            warnings.warn(f'Using cost of the inverse for {str(ope)}')
+        else:
+            warnings.warn(f'Unknown costs for operation {str(ope)}, set to 1')
+            cost = 1
+        self.opCosts[ope] = cost
+        return cost
+
+    def addTask(self, ope, inp: tuple, dep: list, n: int, k: int, result=None) -> tuple:
         """
         Add a task to the pool, considering one operator, one input,
         and a task dependency.
 
+        Tasks computing the same expression up to the sign are shared: the
+        key of the expression (see ExpressionTable) is looked up in the
+        results of the existing tasks. Tasks representing multiplication by
+        the identity matrix are not created, the tasks they depend on are
+        used instead.
+
         Parameters
         ----------
         ope : Symbol
             The operator used for this task.
-        inp : Expression
-            The input of this task (full expression).
-        dep : sympy expression
-            The dependencies for this task, in function of other tasks or
-            block variables.
+        inp : tuple
+            Handle of the input of this task (full expression).
+        dep : list
+            Ids of the tasks this task depends on.
         n : int
             The block of the task
         k : int
@@ -218,62 +680,41 @@ class TaskPool(object):
 
         Returns
         -------
-        task : Symbol
-            The symbol fo this task (T0, T1, ...).
-        res : Expression
-            The result of this task (full expression).
-        """
-        tmpRes = ope * inp
-        notZero = type(tmpRes) != sy.core.numbers.Zero
-
-        if tmpRes in self.results and notZero:
-            task = self.results[tmpRes]
-            return task, tmpRes
-
-        check2 = -ope * inp
-        if check2 in self.results and notZero:
-            task = self.results[check2]
-            return task, tmpRes
-
-        check3 = ope * -inp
-        if check3 in self.results and notZero:
-            task = self.results[check3]
-            return task, tmpRes
-
-        # Task not in pool, create and add it
-        if result is None:
-            task = sy.symbols(f'u_{n}^{k}_{self.counter}', commutative=False)
-        else:
-            task = result
+        tasks : tuple
+            The ids of the tasks providing the result.
+        res : tuple
+            Handle of the result of this task (full expression).
+        """
+        tmpRes = self.expressions.mul(ope, inp)
+        notZero = tmpRes[2] != self.expressions.zero
 
-        # Set cost of the task
-        if type(ope) == sy.Integer or type(ope) == sy.core.numbers.Zero or type(ope) == sy.core.numbers.NegativeOne:
-            cost = 0
-        elif str(ope) in self.blockIteration.blockOps:
-            cost = self.blockIteration.blockOps[str(ope)].cost
-        elif str(ope ** (-1)) in self.blockIteration.blockOps:
-            cost = self.blockIteration.blockOps[str(ope ** (-1))].cost
-            warnings.warn(f'Using cost of the inverse for {str(ope)}')
+        if tmpRes[2] in self.results and notZero:
+            return self.results[tmpRes[2]], tmpRes
+
+        if type(ope) == sy.core.numbers.NegativeOne or type(ope) == sy.core.numbers.One:
+            # Multiplication by the identity matrix, the result is given by the dependencies
+            tasks = tuple(dep)
         else:
-            warnings.warn(f'Unknown costs for operation {str(ope)}, set to 1')
-            cost = 1
-        self.pool[task] = self.createTask(op=ope, fullOp=tmpRes, result=task, cost=cost, n=n, k=k, dep=dep)
-        self.results[tmpRes] = task
+            # Task not in pool, create and add it
+            if result is None:
+                result = sy.Symbol(f'u_{n}^{k}_{self.counter}', commutative=False)
+            tasks = (self.createTask(op=ope, fullOp=tmpRes[0], result=result, cost=self.getCost(ope), n=n, k=k,
+                                     dep=dep),)
+        self.results[tmpRes[2]] = tasks
         self.counter.increment()
 
-        return task, tmpRes
+        return tasks, tmpRes
 
-    def createTask(self, op, fullOp, result: sy.Symbol, cost: float, n: int, k: int, dep: sy.Symbol):
+    def createTask(self, op, fullOp: int, result: sy.Symbol, cost: float, n: int, k: int, dep: list) -> int:
         """
-        Function extracting the tasks from a factorized dictionary and
-        creates multiple tasks
+        Adds a new task to the pool
 
         Parameters
         ----------
         op : sy.core.numbers.Zero, sy.Symbol, sy.Pow, str
             Operation of task
-        fullOp : sy.Mul,
-            Op * approx
+        fullOp : int
+            Expression id of op * approx
         result : sy.Symbol
             Symbol representing result
         cost : float
@@ -282,22 +723,39 @@ class TaskPool(object):
             The block
         k : int
             The iteration
-        dep: sy.Symbol, None
-            Dependency of this operation
+        dep: list
+            Ids of the tasks this task depends on
 
         Returns
         -------
-        newTask : Task,
-            New created task
-        """
-        newTask = Task(op=op, fullOp=fullOp, result=result, cost=cost, n=n, k=k, dep=dep)
-        newTask.color = self.getColor(op=newTask.opType)
-        for item in newTask.dep:
-            task = self.getTask(item)
-            task.followingTasks.append(newTask.result)
+        taskId : int,
+            Id of the new task
+        """
+        taskId = len(self.names)
+        if op not in self.opCodeOfOp:
+            opType = getOpType(op)
+            if opType not in self.opCodeLookup:
+                self.opCodeLookup[opType] = len(self.opTypes)
+                self.opTypes.append(opType)
+                self.colors.append(self.getColor(op=opType))
+            self.opCodeOfOp[op] = self.opCodeLookup[opType]
+        self.names.append(result)
+        self.ids[result] = taskId
+        self.ops.append(op)
+        self.fullOps.append(fullOp)
+        self.costs.append(cost)
+        self.blocks.append(n)
+        self.iterations.append(k)
+        # Main tasks compute a result of the run (u_n^k), subtasks get a generated name (u_n^k_i)
+        self.isMain.append(result.name.count('_') + result.name.count('^') == 2)
+        self.opCodes.append(self.opCodeOfOp[op])
+        self.depLists.append(dep)
+        self.sucLists.append([])
+        for item in dep:
+            self.sucLists[item].append(taskId)
         if k > self.maxIter:
             self.maxIter = k
-        return newTask
+        return taskId
 
     def createTasks(self, dico: dict, n: int, k: int, res: sy.Symbol):
         """
@@ -317,67 +775,138 @@ class TaskPool(object):
 
         Returns
         -------
-        res : sy.Expr
-            Full expression for the result of the dictionary.
-        dep : sy.Expr
-            Expression for the result in function of tasks.
+        res : tuple
+            Handle of the full expression for the result of the dictionary.
+        dep : list
+            Ids of the tasks the result depends on.
+        """
+        return self.instantiate(self.compileRule(dico=dico), dn=0, n=n, k=k, res=res)
+
+    def compileRule(self, dico: dict) -> list:
         """
+        Compiles a factorized dictionary into a list of terms, where the
+        operators are interned and the inputs are given by the key (n, k)
+        of the rule computing them. The compiled rule can be instantiated
+        for any block shift without SymPy operations.
 
-        res_tmp = 0
-        dep = 0
+        Parameters
+        ----------
+        dico : dict
+            Dictionary containing a factorized expression
+
+        Returns
+        -------
+        terms : list
+            (op, inp) pairs, op being None for a copy of the input,
+            inp being the key of a rule or a compiled dictionary
+        """
+        terms = []
         for ope, inp in dico.items():
             if inp == 1:
-                res_tmp = res_tmp + ope
-                dep = res_tmp + ope
-                if res is not None:
-                    self.highestLevelStorage.append([res_tmp, dep])
+                terms.append((None, self.ruleKeys[ope]))
             elif type(inp) is dict:
-                r1, d1 = self.createTasks(dico=inp, n=n, k=k, res=None)
-                t, r = self.addTask(ope=ope, inp=r1, dep=d1, n=n, k=k)
-                if res is not None:
-                    self.highestLevelStorage.append([t, r])
-                res_tmp = res_tmp + r
-                dep = dep + t
+                terms.append((self.expressions.ops[self.expressions.getOpId(ope)], self.compileRule(dico=inp)))
             elif type(inp) is sy.Symbol:
-                t, r = self.addTask(ope=ope, inp=inp, dep=inp, n=n, k=k)
-                res_tmp = res_tmp + r
-                dep = dep + t
-                if res is not None:
-                    self.highestLevelStorage.append([t, r])
+                terms.append((self.expressions.ops[self.expressions.getOpId(ope)], self.ruleKeys[inp]))
             else:
                 raise ValueError(f'CreateTask unknown type: {type(inp)}')
+        return terms
+
+    def getInput(self, key: tuple) -> tuple:
+        """
+        Returns the task id and the handle of the result of a rule
+
+        Parameters
+        ----------
+        key : tuple
+            Block and iteration of the rule
+
+        Returns
+        -------
+        taskId : int
+            Id of the main task of the rule
+        handle : tuple
+            Handle of the result (see ExpressionTable)
+        """
+        if key not in self.inputs:
+            self.inputs[key] = self.expressions.symbol(self.facBlockRules[key]['result'])
+        return self.mainIds[key], self.inputs[key]
+
+    def instantiate(self, terms: list, dn: int, n: int, k: int, res: sy.Symbol):
+        """
+        Creates the tasks of a compiled factorized dictionary, with the
+        block of all inputs shifted by dn
+
+        Parameters
+        ----------
+        terms : list
+            Compiled dictionary, see compileRule
+        dn : int
+            Shift of the block of the inputs
+        n : int
+            The block
+        k : int
+            The iteration
+        res: sy.Symbol. None
+            Result
+
+        Returns
+        -------
+        res : tuple
+            Handle of the full expression for the result of the dictionary.
+        dep : list
+            Ids of the tasks the result depends on.
+        """
+        res_tmp = self.getZero()
+        dep = []
+        for ope, inp in terms:
+            if ope is None:
+                taskId, r = self.getInput((inp[0] + dn, inp[1]))
+                t = (taskId,)
+                res_tmp = self.expressions.add(res_tmp, r)
+                if res is not None:
+                    # The full operation uses res_tmp + ope for this term
+                    self.highestLevelStorage.append(self.expressions.add(res_tmp, r))
+            elif type(inp) is list:
+                r1, d1 = self.instantiate(inp, dn=dn, n=n, k=k, res=None)
+                t, r = self.addTask(ope=ope, inp=r1, dep=d1, n=n, k=k)
+                if res is not None:
+                    self.highestLevelStorage.append(r)
+                res_tmp = self.expressions.add(res_tmp, r)
+            else:
+                taskId, handle = self.getInput((inp[0] + dn, inp[1]))
+                t, r = self.addTask(ope=ope, inp=handle, dep=[taskId], n=n, k=k)
+                res_tmp = self.expressions.add(res_tmp, r)
+                if res is not None:
+                    self.highestLevelStorage.append(r)
+            for item in t:
+                if item not in dep:
+                    dep.append(item)
 
         if res is not None:
-            depe = self.highestLevelStorage[0][0]
-            fullOp = self.highestLevelStorage[0][1]
-            for i in range(1, len(self.highestLevelStorage)):
-                depe = depe + self.highestLevelStorage[i][0]
-                fullOp = fullOp + self.highestLevelStorage[i][1]
+            fullOp = self.highestLevelStorage[0]
+            for item in self.highestLevelStorage[1:]:
+                fullOp = self.expressions.add(fullOp, item)
             self.highestLevelStorage = []
 
-            self.pool[res] = self.createTask(op='+', fullOp=fullOp, result=res, cost=0, n=n, k=k, dep=depe)
+            self.createTask(op='+', fullOp=fullOp[0], result=res, cost=0, n=n, k=k, dep=dep)
         return res_tmp, dep
 
-    def removeTasksRepresentingOne(self) -> None:
-        """
-        Removes tasks from the pool that represent multiplication by the identity matrix
-        """
-        remove_list = []
-        for key, value in self.pool.items():
-            if type(value.op) == sy.core.numbers.NegativeOne or type(value.op) == sy.core.numbers.One:
-                for item in value.dep:
-                    task = self.getTask(item)
-                    task.followingTasks.remove(key)
-                    for y in value.followingTasks:
-                        task.followingTasks.append(y)
-                for item in value.followingTasks:
-                    task = self.getTask(item)
-                    task.dep.remove(key)
-                    for y in value.dep:
-                        task.dep.append(y)
-                remove_list.append(key)
-        for item in remove_list:
-            try:
-                del self.pool[item]
-            except KeyError:
-                raise Exception(f'Failed to remove task {str(item.op)} from taskpool')
+    def compact(self) -> None:
+        """
+        Stores the tasks into arrays. Dependencies and successors are stored
+        in a CSR layout: the ids of the dependencies of task i are
+        depIdx[depPtr[i]:depPtr[i+1]].
+        """
+        self.costs = np.array(self.costs, dtype=float)
+        self.blocks = np.array(self.blocks, dtype=int)
+        self.iterations = np.array(self.iterations, dtype=int)
+        self.isMain = np.array(self.isMain, dtype=bool)
+        self.opCodes = np.array(self.opCodes, dtype=int)
+        for name, lists in (('dep', self.depLists), ('suc', self.sucLists)):
+            ptr = np.zeros(len(lists) + 1, dtype=int)
+            ptr[1:] = np.cumsum([len(item) for item in lists])
+            idx = np.fromiter((i for item in lists for i in item), dtype=int, count=ptr[-1])
+            setattr(self, name + 'Ptr', ptr)
+            setattr(self, name + 'Idx', idx)
+        self.depLists, self.sucLists = None, None
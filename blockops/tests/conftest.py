@@ -0,0 +1,11 @@
+import pytest
+
+from blockops.lookup import lookupTable
+
+
+@pytest.fixture(autouse=True)
+def lookupCache(tmp_path, monkeypatch):
+    """Stores the lookup entries of the tests in a temporary directory"""
+    monkeypatch.setattr(lookupTable, 'cacheDir', str(tmp_path / 'cache'))
+    monkeypatch.setattr(lookupTable, 'loadedEntries', {})
+    monkeypatch.setattr(lookupTable, 'touchedEntries', {})
@@ -9,6 +9,7 @@ import numpy as np
 import pytest
 
 from blockops.block import BlockOperator, scalarBlock, I
+from blockops.utils.vectorize import matVecMul
 
 M = 5
 m1 = np.random.rand(M, M)
@@ -55,6 +56,52 @@ class TestBase:
         uCheck = solve(m2, u)
         assert np.allclose(uTest, uCheck)
 
+    def testFactorCache(self):
+        op = self.op.copy()
+        mats = np.random.rand(10, M, M) + M*np.eye(M)
+        vecs = np.random.rand(10, M)
+        op.matrix, op.invert = None, mats
+        factor = op.factor
+        assert np.allclose(op(vecs), solve(mats, vecs[..., None])[..., 0])
+        assert np.allclose(op(u), solve(mats, np.tile(u, (10, 1))[..., None])[..., 0])
+        assert op.factor is factor
+        opCopy = op.copy()
+        opCopy.invert[0] *= 2
+        assert opCopy.factor is not factor
+        assert np.allclose(opCopy(vecs)[0], solve(opCopy.invert[0], vecs[0]))
+        op.invert *= 2
+        assert op.factor is not factor
+        assert np.allclose(op(vecs), solve(op.invert, vecs[..., None])[..., 0])
+
+    @pytest.mark.parametrize("nLam", [None, 10])
+    @pytest.mark.parametrize("cond", [1e6, 1e10, 1e13])
+    def testIllConditioned(self, cond, nLam):
+        shape = (M, M) if nLam is None else (nLam, M, M)
+        q1, _ = np.linalg.qr(np.random.rand(*shape))
+        q2, _ = np.linalg.qr(np.random.rand(*shape))
+        mats = q1 @ (np.logspace(0, np.log10(cond), M)[:, None] * q2)
+        vecs = matVecMul(mats, np.random.rand(*shape[:-1]))
+        matrix = np.random.rand(M, M) @ mats
+        op = BlockOperator('Op', invert=mats)
+
+        # Relative residuals of the solves, and of the folded matrix
+        def residual(mat, x, v):
+            return np.max(np.linalg.norm(matVecMul(mat, x) - v, axis=-1)
+                          / np.linalg.norm(v, axis=-1))
+
+        assert residual(mats, op(vecs), vecs) < 1e-13
+        op.matrix = matrix
+        compiled = op.compile().matrix
+        assert np.max(np.abs(compiled @ mats - matrix)) < 1e-13 * np.max(np.abs(matrix))
+
+    def testCompile(self):
+        op = self.op.compile()
+        assert op.invert is None
+        assert op.symbol == self.op.symbol
+        assert np.allclose(op(u), self.op(u))
+        op = scalarBlock(2).compile(M)
+        assert np.allclose(op(u), 2*u)
+
     def testIdentity(self):
         op = I
         assert op.name == '1'
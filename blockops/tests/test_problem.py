@@ -23,3 +23,79 @@ def testBasics():
 
     assert prob.noDeltaChi, "non null deltaChi operator"
     assert prob.invariantCoarseProlong, "non invariant coarse prolongation"
+
+
+def testCompile():
+    prob = BlockProblem(
+        np.linspace(-1, 0, 4) + lam, tEnd, N, 'Collocation', nPoints=3)
+    prob.setApprox('RungeKutta', rkScheme='BE')
+    prob.setCoarseLevel(2)
+
+    for name in ['Parareal', 'ABJ', 'ABGS', 'TMG', 'PFASST']:
+        algo = prob.getBlockIteration(name)
+        uRef = algo(nIter=3)
+        coeffs, predictor = dict(algo.blockCoeffs), algo.predictor
+        compiled = algo.compile()
+        for op in [compiled.propagator, compiled.predictor] + list(compiled.blockCoeffs.values()):
+            assert op.invert is None and op.matrix is not None
+        assert np.allclose(compiled(nIter=3), uRef), f"compiled {name} differs"
+        assert all(op is coeffs[key] for key, op in algo.coeffs)
+        assert algo.predictor is predictor
+
+
+def testEvaluation():
+    for lams in [lam, np.linspace(-1, 0, 4) + lam]:
+        prob = BlockProblem(lams, tEnd, N, 'Collocation', nPoints=3)
+        prob.setApprox('RungeKutta', rkScheme='BE')
+        prob.setCoarseLevel(2)
+
+        for name in ['Parareal', 'ABJ', 'ABGS', 'TMG', 'PFASST']:
+            algo = prob.getBlockIteration(name)
+            u = algo(nIter=3, initSol=True)
+
+            # Block by block evaluation
+            uRef = np.zeros_like(u)
+            uRef[:, 0] = u[0, 0]
+            for n in range(N):
+                uRef[0, n + 1] = algo.predictor(uRef[0, n])
+            for k in range(3):
+                for n in range(N):
+                    for (nMod, kMod), blockOp in algo.coeffs:
+                        uRef[k + 1, n + 1] += blockOp(uRef[k + kMod, n + nMod])
+
+            assert np.allclose(u, uRef), f"wrong evaluation for {name}"
+
+
+def testIterate():
+    prob = BlockProblem(
+        np.linspace(-1, 0, 4) + lam, tEnd, N, 'Collocation', nPoints=3)
+    prob.setApprox('RungeKutta', rkScheme='BE')
+    algo = prob.getBlockIteration('Parareal')
+    u = algo(nIter=4, initSol=True)
+
+    levels = list(algo.iterate(nIter=4, initSol=True))
+    assert len(levels) == 5
+    assert np.allclose(np.array(levels), u)
+
+    uNum = prob.getSolution('fine')
+    errors = list(algo.iterate(nIter=4, reduce=lambda uk: np.max(np.abs(uNum - uk), axis=(0, -1))))
+    assert np.allclose(errors, np.max(np.abs(uNum - u[:, 1:]), axis=(1, -1)))
+
+
+def testGetIterations():
+    prob = BlockProblem(
+        np.linspace(-4, 0, 20) + lam, tEnd, N, 'Collocation', nPoints=3)
+    prob.setApprox('RungeKutta', rkScheme='BE')
+    uNum = prob.getSolution('fine')
+    tol = np.linspace(1e-8, 1e-3, 20)
+
+    for name in ['Parareal', 'ABGS']:
+        algo = prob.getBlockIteration(name)
+        nIters = algo.getIterations(nIter=5, uRef=uNum, tol=tol)
+
+        # First iteration below the tolerance, from the full evaluation
+        errors = np.max(np.abs(uNum - algo(nIter=5)), axis=(1, -1))
+        nItersRef = -np.ones(20, dtype=int)
+        for k in range(5, -1, -1):
+            nItersRef[errors[k] < tol] = k
+        assert np.array_equal(nIters, nItersRef), f"wrong number of iterations for {name}"
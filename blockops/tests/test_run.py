@@ -1,11 +1,180 @@
+import os
+
 import numpy as np
 import pytest
 import sympy as sy
 
 from blockops import PintRun
+from blockops.block import BlockOperator
+from blockops.iteration import BlockIteration
+from blockops.utils.expr import Generator
+from blockops.utils.wordAlgebra import Form, ContractionIndex
+
+g = BlockOperator('G', cost=1)  # coarse solver
+f = BlockOperator('F', cost=10)  # fine solver
+
+
+def getRules(run):
+    return [(key, str(value['result']), str(value['rule'])) for key, value in run.facBlockRules.items()]
 
 
 class TestRun:
 
     def testTODO(self):
         assert True
+
+    @pytest.mark.parametrize("nBlocks, kMax", [(6, 2), (3, 4), (6, 4)])
+    def testExtend(self, nBlocks, kMax):
+        parareal = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=f, predictor=g, f=f, g=g)
+        run = PintRun(parareal, nBlocks=3, kMax=[0, 2, 2, 2], useLookup=False)
+        run.extend(nBlocks=nBlocks, kMax=[0] + [kMax] * nBlocks)
+        ref = PintRun(parareal, nBlocks=nBlocks, kMax=[0] + [kMax] * nBlocks, useLookup=False)
+        assert getRules(run) == getRules(ref)
+
+    def testLookupCache(self, tmp_path, monkeypatch):
+        from blockops.lookup import lookupTable
+        monkeypatch.setattr(lookupTable, 'cacheDir', str(tmp_path))
+        monkeypatch.setattr(lookupTable, 'bundledDir', '')
+        monkeypatch.setattr(lookupTable, 'loadedEntries', {})
+        parareal = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=f, predictor=g, f=f, g=g)
+
+        assert lookupTable.findEntry(parareal, 4, [0, 3, 3, 3, 3]) == (False, None)
+        run = PintRun(parareal, nBlocks=4, kMax=[0, 3, 3, 3, 3])
+        assert len(list(tmp_path.glob('v*/*.pickle'))) == 1
+
+        lookUp, entry = lookupTable.findEntry(parareal, 3, [0, 2, 2, 2])
+        assert lookUp
+        ref = PintRun(parareal, nBlocks=3, kMax=[0, 2, 2, 2], useLookup=False)
+        assert getRules(entry) == getRules(ref)
+
+        # Only the requested rules are decoded, and the opened entry is reused
+        path = lookupTable.getEntryPath(str(tmp_path), parareal)
+        assert set(lookupTable.loadedEntries[path].rules) == set(entry.blockRules)
+        assert lookupTable.findEntry(parareal, 3, [0, 2, 2, 2])[1].blockRules == entry.blockRules
+
+        # Hits served by the opened entry still mark it as recently used
+        monkeypatch.setattr(lookupTable, 'touchedEntries', {})
+        monkeypatch.setattr(lookupTable, 'touchInterval', 0)
+        os.utime(path, (0, 0))
+        assert lookupTable.findEntry(parareal, 3, [0, 2, 2, 2])[0]
+        assert os.path.getmtime(path) > 0
+        monkeypatch.setattr(lookupTable, 'touchInterval', 3600)
+        os.utime(path, (0, 0))
+        assert lookupTable.findEntry(parareal, 3, [0, 2, 2, 2])[0]
+        assert os.path.getmtime(path) == 0
+
+        assert lookupTable.findEntry(parareal, 5, [0, 3, 3, 3, 3, 3]) == (False, None)
+
+        lookupTable.evictEntries(str(tmp_path), maxSize=0)
+        assert len(list(tmp_path.glob('v*/*.pickle'))) == 0
+
+    def testLookupUnion(self, tmp_path, monkeypatch):
+        from blockops.lookup import lookupTable
+        monkeypatch.setattr(lookupTable, 'cacheDir', str(tmp_path))
+        monkeypatch.setattr(lookupTable, 'bundledDir', '')
+        parareal = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=f, predictor=g, f=f, g=g)
+        path = lookupTable.getEntryPath(str(tmp_path), parareal)
+
+        # The stored entry covers both runs, each run keeps its own blocks and iterations
+        PintRun(parareal, nBlocks=5, kMax=[0, 2, 2, 2, 2, 2])
+        run = PintRun(parareal, nBlocks=3, kMax=[0, 4, 4, 4])
+        assert (run.nBlocks, run.kMax) == (3, [0, 4, 4, 4])
+        assert getRules(run) == getRules(PintRun(parareal, nBlocks=3, kMax=[0, 4, 4, 4], useLookup=False))
+        entry = lookupTable.loadEntry(path, reload=True)
+        assert (entry.nBlocks, entry.kMax) == (5, [0, 4, 4, 4, 2, 2])
+        assert lookupTable.findEntry(parareal, 5, [0, 2, 2, 2, 2, 2])[0]
+
+        # Smaller runs never replace the entry, even if written in between
+        small = PintRun(parareal, nBlocks=6, kMax=[0, 1, 1, 1, 1, 1, 1], useLookup=False)
+        lookupTable.storeEntry(parareal, small)
+        assert lookupTable.loadEntry(path, reload=True).nBlocks == 5
+        lookupTable.LookupEntry.write(path, small, keepExisting=lambda: True)
+        assert lookupTable.loadEntry(path, reload=True).nBlocks == 5
+
+    def testGenerator(self):
+        gen = Generator(k=10)
+        # u_n^10 = u_{n-1}^10 + u_1^1, the offset of u_1^1 changes with n
+        for n in range(2, 6):
+            gen.check(Form({(0, (n - 1, 10)): 1, (0, (1, 1)): 1}), n)
+        assert gen.mode == 0
+        # u_n^10 = u_{n-1}^10 + u_{n-1}^1
+        for n in range(6, 9):
+            gen.check(Form({(0, (n - 1, 10)): 1, (0, (n - 1, 1)): 1}), n)
+        assert gen.mode == 1
+        assert gen.generatingExpr(12) == Form({(0, (11, 10)): 1, (0, (11, 1)): 1})
+
+    def testContractionIndex(self):
+        parareal = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=f, predictor=g, f=f, g=g)
+        run = PintRun(parareal, nBlocks=6, kMax=[0] + [3] * 6, useLookup=False)
+        algebra = run.algebra
+        table = {**run.levels[0][1], **run.levels[1][1]}
+        expanded = {**run.levels[0][0], **run.levels[1][0], **run.levels[2][0]}
+        index = ContractionIndex(algebra, table)
+        for rule in run.levels[2][0].values():
+            form = algebra.substitute(rule, expanded)
+            # Same result as contracting all computed expressions one after the other
+            ref = form
+            for key, value in table.items():
+                ref = algebra.contract(ref, key, value)
+            assert index.contract(form) == ref
+            ref = form
+            for key in sorted(table, key=lambda x: -algebra.nodes(x)):
+                ref = algebra.contract(ref, key, table[key])
+            assert index.contract(form, bySize=True) == ref
+
+    def testFingerprint(self):
+        parareal = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=f, predictor=g, f=f, g=g)
+        same = BlockIteration("g * u_{n}^{k+1} + f*u_{n}^k - g*u_{n}^k", propagator=f, predictor=g, f=f, g=g)
+        assert parareal.fingerprint() == same.fingerprint()
+        assert parareal.fingerprint(costs=True) == same.fingerprint(costs=True)
+
+        noPred = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=f, f=f, g=g)
+        withRules = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=f, predictor=g,
+                                   rules=[(f * g, g)], f=f, g=g)
+        assert len({parareal.fingerprint(), noPred.fingerprint(), withRules.fingerprint()}) == 3
+
+        cheap = BlockOperator('F', cost=1)
+        other = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=cheap, predictor=g, f=cheap, g=g)
+        assert other.fingerprint() == parareal.fingerprint()
+        assert other.fingerprint(costs=True) != parareal.fingerprint(costs=True)
+
+    def testEquality(self):
+        parareal = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=f, predictor=g, f=f, g=g)
+        same = BlockIteration("(-g + f) u_{n}^k + g * u_{n}^{k+1}", propagator=f, predictor=g, f=f, g=g)
+        assert parareal == same and hash(parareal) == hash(same)
+        assert len({parareal, same}) == 1
+        assert parareal != parareal.update
+
+        # Same rules with other costs
+        cheap = BlockOperator('F', cost=1)
+        other = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=cheap, predictor=g, f=cheap, g=g)
+        assert other.fingerprint() == parareal.fingerprint()
+        assert other != parareal
+        assert len({parareal, other}) == 2
+
+    def testCheckpoint(self, tmp_path, monkeypatch):
+        parareal = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=f, predictor=g, f=f, g=g)
+        checkpoint = str(tmp_path / 'run.checkpoint')
+        ref = PintRun(parareal, nBlocks=6, kMax=[0] + [4] * 6, useLookup=False)
+
+        # Interrupt the run after the second iteration level
+        createLevel = PintRun.createLevel
+
+        def interruptedLevel(self, k, nStart=0):
+            if k == 2:
+                raise KeyboardInterrupt
+            createLevel(self, k, nStart)
+
+        monkeypatch.setattr(PintRun, 'createLevel', interruptedLevel)
+        with pytest.raises(KeyboardInterrupt):
+            PintRun(parareal, nBlocks=6, kMax=[0] + [4] * 6, useLookup=False, checkpoint=checkpoint)
+        monkeypatch.setattr(PintRun, 'createLevel', createLevel)
+
+        # Resume from the checkpoint, levels 0 and 1 are not created again
+        created = []
+        monkeypatch.setattr(PintRun, 'createLevel',
+                            lambda self, k, nStart=0: created.append(k) or createLevel(self, k, nStart))
+        run = PintRun(parareal, nBlocks=6, kMax=[0] + [4] * 6, useLookup=False, checkpoint=checkpoint)
+        assert created == [2, 3, 4]
+        assert getRules(run) == getRules(ref)
+        assert not (tmp_path / 'run.checkpoint').exists()
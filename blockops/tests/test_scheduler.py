@@ -0,0 +1,176 @@
+import numpy as np
+import pytest
+
+from blockops import PintRun
+from blockops.block import BlockOperator
+from blockops.iteration import BlockIteration
+from blockops.taskPool import TaskPool
+from blockops.scheduler import getSchedule, getSchedules, getLowerBound, ProcessAvailability, SCHEDULER
+
+g = BlockOperator('G', cost=1)  # coarse solver
+f = BlockOperator('F', cost=10)  # fine solver
+
+
+parareal = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=f, predictor=g, f=f, g=g)
+
+
+def getPool(nBlocks=6, kMax=3):
+    run = PintRun(parareal, nBlocks=nBlocks, kMax=[0] + [kMax] * nBlocks, useLookup=False)
+    return TaskPool(run=run)
+
+
+def checkSchedule(scheduler):
+    pool = scheduler.taskPool
+    assert len(scheduler.schedule) == pool.nTasks
+    for name, task in pool.pool.items():
+        scheduled = scheduler.schedule[name]
+        assert scheduled.end == scheduled.start + task.cost
+        for dep in task.dep:
+            assert scheduler.schedule[dep].end <= scheduled.start
+    procs = {}
+    for scheduled in scheduler.schedule.values():
+        procs.setdefault(scheduled.proc, []).append((scheduled.start, scheduled.end))
+    for intervals in procs.values():
+        intervals.sort()
+        for (_, end), (start, _) in zip(intervals[:-1], intervals[1:]):
+            assert end <= start
+    assert scheduler.getRuntime() == max(scheduled.end for scheduled in scheduler.schedule.values())
+
+
+class TestScheduler:
+
+    def testProcessAvailability(self):
+        procs = ProcessAvailability(5)
+        assert procs.first(0) == 0
+        procs[0], procs[1], procs[2] = 3, 1, 2
+        assert procs.first(1.5) == 1
+        assert procs.first(0) == 3
+        procs[3], procs[4] = 4, 5
+        assert procs.first(0.5) is None
+        assert procs.earliest() == 1
+        assert list(procs.times) == [3, 1, 2, 4, 5]
+
+        # Processes can be added beyond the initial size
+        procs = ProcessAvailability(0)
+        assert procs.first(0) is None
+        for i in range(20):
+            assert procs.addProcess() == i
+            procs[i] = i + 1
+        assert len(procs) == 20
+        assert procs.first(10.5) == 0
+        procs[0] = 20
+        assert procs.first(10.5) == 1
+        assert procs.earliest() == 1
+
+    @pytest.mark.parametrize("schedulerType, nProc", [('BLOCK-BY-BLOCK', 6), ('LCF', 6), ('LCF', 2),
+                                                      ('OPTIMAL', None), ('HEFT', 6), ('HEFT', 2)])
+    def testSchedulers(self, schedulerType, nProc):
+        pool = getPool()
+        scheduler = getSchedule(taskPool=pool, nProc=nProc, nPoints=7, schedulerType=schedulerType)
+        checkSchedule(scheduler)
+        assert scheduler.getRuntime() >= np.sum(pool.costs) / scheduler.nProc
+
+    def testUpwardRanks(self):
+        pool = getPool()
+        ranks = pool.getUpwardRanks()
+        for taskId in range(pool.nTasks):
+            following = [ranks[item] for item in pool.getSuccessors(taskId)]
+            assert ranks[taskId] == pool.costs[taskId] + max(following, default=0)
+
+    def testCriticalPath(self):
+        pool = getPool()
+        # Dependencies are always created before the tasks depending on them
+        finish = np.zeros(pool.nTasks)
+        for taskId in range(pool.nTasks):
+            previous = [finish[item] for item in pool.getDependencies(taskId)]
+            finish[taskId] = pool.costs[taskId] + max(previous, default=0)
+        length, path, slack = pool.getCriticalPath()
+        assert length == finish.max() == pool.getUpwardRanks().max()
+        assert np.allclose(pool.getDownwardRanks(), finish - pool.costs)
+        assert sum(pool.getTask(name).cost for name in path) == length
+        for name, following in zip(path[:-1], path[1:]):
+            assert name in pool.getTask(following).dep
+        assert slack.min() >= 0
+        assert all(slack[pool.ids[name]] == 0 for name in path)
+
+    def testHEFT(self):
+        pool = getPool()
+        heft = getSchedule(taskPool=pool, nProc=6, nPoints=7, schedulerType='HEFT')
+        lcf = getSchedule(taskPool=pool, nProc=6, nPoints=7, schedulerType='LCF')
+        assert heft.getRuntime() == pool.getUpwardRanks().max()
+        assert heft.getRuntime() < lcf.getRuntime()
+
+    @pytest.mark.parametrize("schedulerType", ['BLOCK-BY-BLOCK', 'LCF', 'OPTIMAL', 'HEFT'])
+    def testSchedules(self, schedulerType):
+        pool = getPool()
+        nProcList = [1, 2, 3, 6]
+        runtimes = getSchedules(taskPool=pool, nProcList=nProcList, nPoints=7, schedulerType=schedulerType)
+        for nProc, runtime in zip(nProcList, runtimes):
+            scheduler = getSchedule(taskPool=pool, nProc=nProc, nPoints=7, schedulerType=schedulerType)
+            assert runtime == scheduler.getRuntime()
+
+    @pytest.mark.parametrize("schedulerType", ['BLOCK-BY-BLOCK', 'LCF', 'OPTIMAL', 'HEFT'])
+    def testLowerBounds(self, schedulerType):
+        pool = getPool()
+        for nProc in [1, 2, 3, 6]:
+            bounds = SCHEDULER[schedulerType].getLowerBounds(taskPool=pool, nProc=nProc, nPoints=7)
+            assert bounds['criticalPath'] == pool.getCriticalPath()[0]
+            if schedulerType == 'OPTIMAL':
+                assert 'work' not in bounds
+            else:
+                assert bounds['work'] == np.sum(pool.costs) / nProc
+            scheduler = getSchedule(taskPool=pool, nProc=nProc, nPoints=7, schedulerType=schedulerType)
+            bound = getLowerBound(taskPool=pool, nProc=nProc, nPoints=7, schedulerType=schedulerType)
+            assert bound == max(bounds.values())
+            assert bound <= scheduler.getRuntime()
+        if schedulerType == 'BLOCK-BY-BLOCK':
+            # With one process per block, the runtime is given by the most loaded block
+            assert bounds['blocks'] == max(pool.costs[pool.blocks == n].sum() for n in range(7))
+
+    def testSchedulesPruning(self):
+        pool = getPool()
+        nProcList = [1, 2, 3, 6]
+        runtimes = getSchedules(taskPool=pool, nProcList=nProcList, nPoints=7, schedulerType='LCF')
+        maxRuntime = runtimes[2]
+        pruned = getSchedules(taskPool=pool, nProcList=nProcList, nPoints=7, schedulerType='LCF',
+                              maxRuntime=maxRuntime)
+        for runtime, prunedRuntime in zip(runtimes, pruned):
+            assert prunedRuntime == runtime or (prunedRuntime == np.inf and runtime > maxRuntime)
+        assert pruned[0] == np.inf
+
+        # The critical path is computed once for all numbers of procs
+        pool = getPool()
+        calls = []
+        getLongestPaths = pool.getLongestPaths
+        pool.getLongestPaths = lambda upward=True: calls.append(upward) or getLongestPaths(upward)
+        getSchedules(taskPool=pool, nProcList=nProcList, nPoints=7, schedulerType='BLOCK-BY-BLOCK',
+                     maxRuntime=maxRuntime)
+        assert calls == [True]
+
+        # Speedup of Parareal is bounded by N/K
+        speedup, efficiency, nProc, _ = parareal.getPerformances(N=6, K=3, nProc=6, minSpeedup=2)
+        assert np.isnan(speedup) and np.isnan(efficiency) and nProc == 6
+        speedup, _, nProc, _ = parareal.getPerformances(N=6, K=3, minSpeedup=2)
+        assert np.isnan(speedup) and nProc == 6
+        speedup, _, _, _ = parareal.getPerformances(N=6, K=3, nProc=6, minSpeedup=0.5)
+        assert 0.5 <= speedup < 2
+
+    def testPerformancesRun(self):
+        run = PintRun(parareal, nBlocks=10, kMax=[0] + [3] * 10, useLookup=False)
+        rules = dict(run.blockRules)
+        ref = parareal.getPerformances(N=5, K=4, nProc=5)
+
+        # The run is extended to cover both computations, no rule is lost
+        speedup, _, _, newRun = parareal.getPerformances(N=5, K=4, nProc=5, run=run)
+        assert newRun is run
+        assert run.nBlocks == 10 and run.kMax == [0] + [4] * 5 + [3] * 5
+        assert all(run.blockRules[key] == rule for key, rule in rules.items())
+        assert speedup == ref[0]
+
+        # Runs that cannot be extended to cover the request are kept unchanged
+        run = PintRun(parareal, nBlocks=4, kMax=[0, 2, 2, 4, 4], useLookup=False)
+        rules = dict(run.blockRules)
+        speedup, _, _, newRun = parareal.getPerformances(N=5, K=4, nProc=5, run=run)
+        assert newRun is not run and newRun.nBlocks == 5
+        assert run.nBlocks == 4 and run.blockRules == rules
+        assert speedup == ref[0]
@@ -1,10 +1,94 @@
 import pytest
 import sympy as sy
 
-from blockops.taskPool import TaskPool, Task, COLOR_LIST
+from blockops import PintRun
+from blockops.block import BlockOperator
+from blockops.iteration import BlockIteration
+from blockops.taskPool import TaskPool, Task, ExpressionTable, COLOR_LIST
+
+g = BlockOperator('G', cost=1)  # coarse solver
+f = BlockOperator('F', cost=10)  # fine solver
+
+
+def getTasks(pool):
+    return [(str(name), str(task.op), task.fullOP.args, [str(dep) for dep in task.dep], task.cost)
+            for name, task in pool.pool.items()]
 
 
 class TestTaskPool:
 
     def testTOOD(self):
         assert True
+
+    def testTemplates(self, monkeypatch):
+        parareal = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=f, predictor=g, f=f, g=g)
+        run = PintRun(parareal, nBlocks=14, kMax=[0] + [3] * 14, useLookup=False)
+        assert len(run.templates) > 0
+        pool = TaskPool(run=run)
+
+        # Same rules and tasks if all rules are created by SymPy
+        monkeypatch.setattr(PintRun, 'shiftRule', lambda self, n, k: None)
+        ref = PintRun(parareal, nBlocks=14, kMax=[0] + [3] * 14, useLookup=False)
+        assert ref.templates == {}
+        for key, value in ref.facBlockRules.items():
+            assert run.blockRules[key]['rule'].args == ref.blockRules[key]['rule'].args
+            assert repr(run.facBlockRules[key]['rule']) == repr(value['rule'])
+        assert getTasks(pool) == getTasks(TaskPool(run=ref))
+
+        # Generated rules are instantiated from the compiled anchor rules only
+        assert set(pool.programs) == set(run.templates.values())
+        for key in run.templates:
+            run.facBlockRules[key] = {'result': run.facBlockRules[key]['result'], 'rule': None}
+        assert getTasks(TaskPool(run=run)) == getTasks(pool)
+
+    def testArrays(self):
+        parareal = BlockIteration("(f - g) u_{n}^k + g * u_{n}^{k+1}", propagator=f, predictor=g, f=f, g=g)
+        run = PintRun(parareal, nBlocks=4, kMax=[0] + [3] * 4, useLookup=False)
+        pool = TaskPool(run=run)
+
+        assert pool.nTasks == len(pool.pool) == len(pool.costs) == len(pool.depPtr) - 1
+        assert len(pool.depIdx) == len(pool.sucIdx)
+        for i, (name, task) in enumerate(pool.pool.items()):
+            assert isinstance(task, Task) and task.id == i == pool.ids[name]
+            assert task.result == name
+            assert task.type == ('main' if len(name.name.split('_')) == 2 else 'sub')
+            assert task.color == pool.colorLookup[task.opType]
+            for item in pool.getDependencies(i):
+                assert item < i
+                assert i in pool.getSuccessors(item)
+            assert [pool.getTask(item).result for item in task.dep] == task.dep
+        assert str(pool.pool[sy.Symbol('u_4^3', commutative=False)].op) == '+'
+
+        # No task for the multiplications by -1, G uses u_n^k directly
+        assert all(type(task.op) not in (sy.core.numbers.One, sy.core.numbers.NegativeOne)
+                   for task in pool.pool.values())
+        task = next(task for task in pool.pool.values() if task.block == 3 and task.iteration == 2
+                    and str(task.op) == 'G' and len(task.dep) == 2)
+        assert sorted(str(dep) for dep in task.dep) == ['u_2^1', 'u_2^2']
+
+    def testExpressionTable(self):
+        table = ExpressionTable()
+        u0, u1 = sy.symbols('u_0^0, u_1^0', commutative=False)
+        G, F = sy.symbols('G, F', commutative=False)
+        a, b = table.symbol(u0), table.symbol(u1)
+
+        # Same key up to the sign
+        diff = table.add(a, table.mul(sy.S.NegativeOne, b))
+        for expr, sign in [(table.mul(G, diff), 1),
+                           (table.mul(-G, diff), -1),
+                           (table.mul(G, table.add(table.mul(sy.S.NegativeOne, a), b)), -1),
+                           (table.mul(G, table.add(table.mul(sy.S.NegativeOne, b), a)), 1)]:
+            assert expr[2] == table.mul(G, diff)[2]
+            assert expr[1] == sign
+        assert table.mul(2 * G, diff)[2] != table.mul(G, diff)[2]
+        assert table.mul(F, diff)[2] != table.mul(G, diff)[2]
+
+        # Products are combined like in SymPy
+        assert table.mul(G ** -1, table.mul(G, a))[2] == a[2]
+        assert table.mul(G * F, a)[2] == table.mul(G, table.mul(F, a))[2]
+        assert table.mul(G, table.mul(G, a))[2] == table.mul(G ** 2, a)[2]
+
+        # Expressions are built by SymPy on request
+        expr = table.add(table.mul(G, diff), table.mul(F, a))
+        assert table.getExpression(expr[0]) == G * (u0 - u1) + F * u0
+        assert table.getExpression(table.mul(sy.S.Zero, a)[0]) == 0
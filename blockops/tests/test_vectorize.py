@@ -6,10 +6,11 @@ Created on Wed Dec 21 16:35:00 2022
 @author: tlunet
 """
 import numpy as np
+from scipy.linalg import lu_factor
 
 M, nDOF = 5, 100
 
-from blockops.utils.vectorize import matVecMul, matVecInv, matMatMul
+from blockops.utils.vectorize import matVecMul, matVecInv, matMatMul, luFactor, luSolve
 
 def generate(M, nDOF):
     mat = np.random.rand(nDOF, M, M)
@@ -67,6 +68,38 @@ def testMatVecInv():
     assert np.allclose(out, np.linalg.solve(mat[0], u[0]))
 
 
+def testLUSolve():
+    """Test vectorized LU factorization and solves (luFactor, luSolve)"""
+    mat, u = generate(M, nDOF)
+    lu, piv = luFactor(mat)
+    for i in range(nDOF):
+        luRef, pivRef = lu_factor(mat[i])
+        assert np.allclose(lu[i], luRef)
+        assert np.array_equal(piv[i], pivRef)
+
+    for trans in [False, True]:
+        matT = mat.transpose((0, 2, 1)) if trans else mat
+
+        # -- luSolve for (nDOF, M, M), (nDOF, M)
+        out = luSolve((lu, piv), u, trans)
+        for i in range(nDOF):
+            assert np.allclose(out[i], np.linalg.solve(matT[i], u[i]))
+
+        # -- luSolve for (M, M), (nDOF, M)
+        out = luSolve(luFactor(mat[0]), u, trans)
+        for i in range(nDOF):
+            assert np.allclose(out[i], np.linalg.solve(matT[0], u[i]))
+
+        # -- luSolve for (nDOF, M, M), (M,)
+        out = luSolve((lu, piv), u[0], trans)
+        for i in range(nDOF):
+            assert np.allclose(out[i], np.linalg.solve(matT[i], u[0]))
+
+        # -- luSolve for (M, M), (M,)
+        out = luSolve(luFactor(mat[0]), u[0], trans)
+        assert np.allclose(out, np.linalg.solve(matT[0], u[0]))
+
+
 def testMatMatMul():
     """Test vectorized Matrix Matrix Multiplication (matMatMul)"""
     m1 = generate(M, 1)[0]
@@ -0,0 +1,125 @@
+import pytest
+import sympy as sy
+
+from blockops.utils.expr import getFactorizedRule
+from blockops.utils.wordAlgebra import WordAlgebra, Form, ContractionIndex
+
+G, F, R, P, I = sy.symbols('G, F, R, P, I', commutative=False)
+u0, u1, u2, v = (0, 0), (1, 0), (2, 0), (3, 0)
+
+
+def getAlgebra():
+    return WordAlgebra(rules={R * P: I})
+
+
+class TestWordAlgebra:
+
+    @pytest.mark.parametrize("op", [G, F - G, G * F - 2 * F ** (-1), G ** 2 * F, sy.Rational(1, 2) * G])
+    def testApply(self, op):
+        algebra = getAlgebra()
+        U0 = algebra.symbol(u0)
+        assert algebra.toSympy(algebra.apply(op, u0)) == sy.expand(op * U0)
+
+    def testCancellation(self):
+        algebra = getAlgebra()
+        assert algebra.apply(G ** (-1) * G, u0) == Form({(0, u0): 1})
+        assert algebra.apply(F * G * G ** (-1) * F ** (-1), u0) == Form({(0, u0): 1})
+        assert algebra.apply(F * G ** (-1) * G * G, u0) == algebra.apply(F * G, u0)
+        wG, wGinv = algebra.apply(G, u0), algebra.apply(G ** (-1), u0)
+        (word, _), = wG.terms
+        (wordInv, _), = wGinv.terms
+        assert algebra.concat(word, wordInv) == 0
+        assert algebra.add(algebra.apply(G, u0), algebra.apply(-G, u0)) == Form()
+        assert algebra.toSympy(Form()) == 0
+
+    def testSubstitute(self):
+        algebra = getAlgebra()
+        U0, U1 = algebra.symbol(u0), algebra.symbol(u1)
+        form = algebra.add(algebra.apply(F, u1), algebra.apply(G, u0))
+        assert algebra.substitute(form, {u2: algebra.apply(G, u0)}) is form
+
+        # Products with sums are not expanded, like SymPy subs
+        value = algebra.add(algebra.apply(F, u0), algebra.apply(-G, u0))
+        new = algebra.substitute(form, {u1: value})
+        assert algebra.toSympy(new) == (F * U1 + G * U0).subs(U1, algebra.toSympy(value))
+        assert algebra.toSympy(new) == F * (F * U0 - G * U0) + G * U0
+
+        # Single terms are merged with the operator
+        new = algebra.substitute(form, {u1: algebra.apply(G, u0)})
+        assert new == algebra.apply(F * G + G, u0)
+
+    def testContract(self):
+        algebra = getAlgebra()
+        U0, U1, U2, V = [algebra.symbol(u) for u in (u0, u1, u2, v)]
+
+        # Single term
+        form = algebra.apply(F * G - 2 * G, u0)
+        new = algebra.contract(form, algebra.apply(G, u0), v)
+        assert algebra.toSympy(new) == algebra.toSympy(form).subs(G * U0, V)
+        assert algebra.toSympy(new) == F * V - 2 * V
+
+        # Sum of terms, and its opposite
+        key = algebra.add(algebra.apply(G, u0), algebra.apply(F, u1))
+        for sign in [1, -1]:
+            form = algebra.add(algebra.apply(sign * G, u0), algebra.apply(sign * F, u1), algebra.apply(F, u2))
+            new = algebra.contract(form, key, v)
+            assert algebra.toSympy(new) == algebra.toSympy(form).subs(G * U0 + F * U1, V)
+            assert new == algebra.add(algebra.apply(sign, v), algebra.apply(F, u2))
+
+        # Inside nested sums
+        form = algebra.substitute(algebra.apply(F, u2), {u2: algebra.add(key, algebra.apply(G, u2))})
+        new = algebra.contract(form, key, v)
+        assert algebra.toSympy(new) == F * (V + G * U2)
+        assert algebra.contract(form, algebra.apply(F, u1), v) is not form
+        assert algebra.contract(form, algebra.apply(F, u0), v) is form
+
+    def testApplyRules(self):
+        algebra = getAlgebra()
+        U0 = algebra.symbol(u0)
+        form = algebra.apply(G * R * P * F + R * P, u0)
+        new = algebra.applyRules(form)
+        assert algebra.toSympy(new) == sy.expand(algebra.toSympy(form).subs(R * P, I))
+        assert algebra.toSympy(new) == G * I * F * U0 + I * U0
+        assert algebra.applyRules(algebra.apply(P * R, u0)) == algebra.apply(P * R, u0)
+        assert WordAlgebra().applyRules(form) is form
+
+    def testToSympy(self):
+        algebra = getAlgebra()
+        U0, U1 = algebra.symbol(u0), algebra.symbol(u1)
+        assert algebra.symbol(u0) is U0
+        assert algebra.toSympy(algebra.apply(1, u0)) == U0
+        form = algebra.add(algebra.apply(G ** 2 * F ** (-1), u0), algebra.apply(-sy.Rational(3, 2) * F, u1))
+        assert algebra.toSympy(form) == G ** 2 * F ** (-1) * U0 - sy.Rational(3, 2) * F * U1
+        for (word, atom), c in form.terms.items():
+            assert algebra.toSympy(Form({(word, atom): c})) in algebra.toSympy(form).args
+        assert algebra.nodes(form) == len(list(sy.preorder_traversal(algebra.toSympy(form))))
+
+    def testForm(self):
+        form = Form({(1, (0, 0)): 2, (0, (1, 0)): 1})
+        assert form == Form({(0, (1, 0)): 1, (1, (0, 0)): 2})
+        assert hash(form) == hash(Form(dict(reversed(list(form.terms.items())))))
+        assert form.atoms() == {(0, 0), (1, 0)}
+        assert form.shift(2) == Form({(1, (2, 0)): 2, (0, (3, 0)): 1})
+        assert not form.isAtomic and Form({(0, (1, 0)): 1}).isAtomic and Form().isAtomic
+        nested = Form({(1, form): 1, (0, (0, 0)): 1})
+        assert nested.atoms() == {(0, 0), (1, 0)}
+        assert nested.shift(1) == Form({(1, form.shift(1)): 1, (0, (1, 0)): 1})
+
+    def testContractionIndex(self):
+        algebra = getAlgebra()
+        table = {algebra.apply(G, u0): u1, algebra.add(algebra.apply(F, u0), algebra.apply(G, u1)): u2}
+        index = ContractionIndex(algebra, table)
+        form = algebra.apply(F * G + F + G * G, u0)
+        ref = form
+        for key, value in table.items():
+            ref = algebra.contract(ref, key, value)
+        assert index.contract(form) == ref == algebra.add(algebra.apply(F, u1), algebra.apply(1, u2))
+        assert index.contract(algebra.apply(F, u1)) == algebra.apply(F, u1)
+
+    def testFactorization(self):
+        algebra = getAlgebra()
+        U0, U1, U2 = [algebra.symbol(u) for u in (u0, u1, u2)]
+        form = algebra.add(algebra.apply(G * F, u0), algebra.apply(G, u1), algebra.apply(-G * F, u2),
+                           algebra.apply(F, u1))
+        # Terms with the same leading operator are grouped
+        assert getFactorizedRule(algebra.toSympy(form)) == {F: U1, G: {U1: 1, F: {U0: 1, -1: U2}}}
@@ -1,5 +1,6 @@
 import numpy as np
 import copy
+from itertools import zip_longest
 
 #from blockops import PintRun
 
@@ -13,12 +14,48 @@ def checkRunParameters(run: object, N: int, K: list) -> bool:
     :param K: List of number of iterations per block
     :return: True if check passes, else false
     """
-    if N > run.nBlocks or len(K) > len(run.kMax) or np.max(np.array(K) > np.array(run.kMax)[:len(K)]):
+    return checkParameters(run.nBlocks, run.kMax, N, K)
+
+
+def checkParameters(nBlocks: int, kMax: list, N: int, K: list) -> bool:
+    """
+    Check if a run with nBlocks blocks and kMax iterations contains the
+    rules of a run with N blocks and K iterations
+
+    :param nBlocks: Number of blocks of the larger run
+    :param kMax: List of number of iterations per block of the larger run
+    :param N: Number of blocks
+    :param K: List of number of iterations per block
+    :return: True if check passes, else false
+    """
+    if N > nBlocks or len(K) > len(kMax) or np.max(np.array(K) > np.array(kMax)[:len(K)]):
+        return False
+    # Blocks with less iterations limit the iterations used by the next blocks,
+    # hence their number of iterations must be the same in the run
+    elif any(k != kRun and k != max(K) for k, kRun in zip(K, kMax)):
         return False
     else:
         return True
 
 
+def unionRunParameters(run: object, N: int, K: list) -> tuple:
+    """
+    Computes the smallest number of blocks and iterations such that the
+    extended run contains both the existing rules and the rules for N and K
+
+    :param run: Existing PintRun
+    :param N: Number of blocks
+    :param K: List of number of iterations per block
+    :return: Number of blocks and list of number of iterations per block,
+        or None if no extension of the run contains the rules for N and K
+    """
+    nBlocks = max(N, run.nBlocks)
+    kMax = [max(k, kRun) for k, kRun in zip_longest(K, run.kMax, fillvalue=0)]
+    if checkParameters(nBlocks, kMax, N, K) and checkParameters(nBlocks, kMax, run.nBlocks, run.kMax):
+        return nBlocks, kMax
+    return None
+
+
 def reduceRun(run: object, N: int, K: list, useCopy: bool = True) -> object:
     """
     Reduces an existing run to a smaller or equal number of iterations and/or blocks.
@@ -50,5 +87,8 @@ def reduceRun(run: object, N: int, K: list, useCopy: bool = True) -> object:
 
     newRun.blockRules = tmpBlockRules
     newRun.facBlockRules = tmpFacBlockRules
+    newRun.templates = {key: anchor for key, anchor in getattr(run, 'templates', {}).items()
+                        if key in tmpBlockRules and anchor in tmpBlockRules}
+    newRun.levels = []  # Reduced run cannot be extended anymore
 
     return newRun
@@ -7,6 +7,9 @@ Utility functions and classes for expression parsing and manipulation
 """
 import sympy as sy
 import re
+from collections import deque
+
+from blockops.utils.wordAlgebra import Form
 
 Add = sy.core.add.Add
 Mul = sy.core.mul.Mul
@@ -108,12 +111,48 @@ def getCoeffsFromFormula(s: str, blockOps: dict) -> dict:
     while s != '':
         nIndex, kIndex, block, s = extractTerm(s)
         try:
-            coeffs[(nIndex, kIndex)] += eval(block, blockOps)
+            # Not in place, the coefficient may be one of the given block operators
+            coeffs[(nIndex, kIndex)] = coeffs[(nIndex, kIndex)] + eval(block, blockOps)
         except KeyError:
             coeffs[(nIndex, kIndex)] = eval(block, blockOps)
     return coeffs
 
 
+def canonicalExpr(expr) -> tuple:
+    """
+    Canonical representation of an operator expression, independent of the
+    way it was written (e.g "F - G", "-G + F" or "F*(I - F**(-1)*G)" with
+    I = 1 all give the same representation)
+
+    Parameters
+    ----------
+    expr : sy.Expr, int, float or None
+        The expression
+
+    Returns
+    -------
+    canonical : tuple
+        Nested tuples of strings, ordered independently of the terms order
+    """
+    if expr is None:
+        return ('None',)
+    return canonicalTree(sy.expand(sy.sympify(expr)))
+
+
+def canonicalTree(expr) -> tuple:
+    """Canonical representation of an expanded expression, see canonicalExpr"""
+    if isinstance(expr, Symbol):
+        return ('Symbol', expr.name, bool(expr.is_commutative))
+    if len(expr.args) == 0:
+        return (type(expr).__name__, str(expr))
+    if isinstance(expr, Add):
+        return ('Add',) + tuple(sorted(canonicalTree(arg) for arg in expr.args))
+    if isinstance(expr, Mul):
+        c, nc = expr.args_cnc()
+        return ('Mul', tuple(sorted(canonicalTree(arg) for arg in c)), tuple(canonicalTree(arg) for arg in nc))
+    return (type(expr).__name__,) + tuple(canonicalTree(arg) for arg in expr.args)
+
+
 def getLeadingTerm(expr: Mul):
     """
 
@@ -211,6 +250,10 @@ def decomposeRule(expr, dico: dict) -> dict:
     """
     Translate expression to dictionary representation
 
+    The terms with the same leading term are summed at once, which gives
+    the same result as adding them one after the other, but sorts the
+    arguments of the sum only once.
+
     Parameters
     ----------
     expr : sy.Add, sy.Mul, sy.Symbol
@@ -223,33 +266,27 @@ def decomposeRule(expr, dico: dict) -> dict:
     newLeading: dico
         Updated dictionary
     """
+    rests = {leading: [rest] for leading, rest in dico.items()}  # Terms of each leading term
     if type(expr) == sy.Mul:
-        term = expr
-        leading, rest = getLeadingTerm(term)
-        if type(leading) == Pow and int(leading.exp) > 1:
-            leading, rest = expandPowers(leading, rest)
-        try:
-            dico[leading] += rest
-        except KeyError:
-            dico[leading] = rest
+        terms = [expr]
     elif type(expr) == sy.Add:
-        for term in expr.args:
-            if type(term) == Symbol:
-                dico[term] = 1
-            elif type(term) == Mul:
-                leading, rest = getLeadingTerm(term)
-                if type(leading) == Pow and int(leading.exp) > 1:
-                    leading, rest = expandPowers(leading, rest)
-                try:
-                    dico[leading] += rest
-                except KeyError:
-                    dico[leading] = rest
-            else:
-                raise ValueError('got neither Symbol nor Mul')
+        terms = expr.args
     elif type(expr) == Symbol:
-        dico[expr] = 1
+        terms = [expr]
     else:
         raise Exception(f'Unknown expression type {type(expr)}')
+    for term in terms:
+        if type(term) == Symbol:
+            rests[term] = [1]
+        elif type(term) == Mul:
+            leading, rest = getLeadingTerm(term)
+            if type(leading) == Pow and int(leading.exp) > 1:
+                leading, rest = expandPowers(leading, rest)
+            rests.setdefault(leading, []).append(rest)
+        else:
+            raise ValueError('got neither Symbol nor Mul')
+    for leading, items in rests.items():
+        dico[leading] = items[0] if len(items) == 1 else Add(*items)
     return dico
 
 
@@ -283,6 +320,136 @@ def expandTree(dico: dict):
             raise ValueError('got neither Add nor Mul')
 
 
+def getShiftMapping(symbols, dn: int, symbol=None) -> dict:
+    """
+    Create the mapping shifting the block index of all unknowns u_n^k
+    contained in a list of symbols
+
+    Parameters
+    ----------
+    symbols : iterable of sy.Symbol
+        Symbols to consider, other symbols than unknowns are ignored
+    dn : int
+        Shift of the block index
+    symbol : callable, optional
+        Returns the symbol of the unknown (n, k), e.g from a cache of the
+        symbols (default: new SymPy symbol)
+
+    Returns
+    -------
+    mapping : dict
+        Old symbol to new symbol
+    """
+    mapping = {}
+    for sym in symbols:
+        parts = re.split('_|\^', sym.name)
+        if len(parts) == 3 and parts[0] == 'u':
+            if symbol is None:
+                mapping[sym] = sy.Symbol(f'u_{int(parts[1]) + dn}^{parts[2]}', commutative=False)
+            else:
+                mapping[sym] = symbol((int(parts[1]) + dn, int(parts[2])))
+    return mapping
+
+
+def keepsOrder(symbols: list, mapping: dict) -> bool:
+    """
+    Check if a mapping preserves the order of the symbol names.
+
+    SymPy orders the arguments of sums (and thus the factorized rules)
+    by comparing symbol names, such that renaming symbols with such a
+    mapping gives the same expression as the one SymPy would build.
+
+    Parameters
+    ----------
+    symbols : list of sy.Symbol
+        Symbols sorted by name
+    mapping : dict
+        Old symbol to new symbol
+
+    Returns
+    -------
+    keepsOrder : bool
+        If the renamed symbols are still sorted
+    """
+    names = [mapping.get(sym, sym).name for sym in symbols]
+    return all(a < b for a, b in zip(names[:-1], names[1:]))
+
+
+def getFixedTerms(expr, symbols) -> set:
+    """
+    Returns the sub-expressions of an expression or a factorized rule that
+    do not contain any of the given symbols, and thus are not changed by
+    shiftSymbols.
+
+    Parameters
+    ----------
+    expr : sy.Expr or dict
+        Expression or factorized rule
+    symbols : iterable of sy.Symbol
+        Symbols renamed by the shifts
+
+    Returns
+    -------
+    fixed : set
+        The sub-expressions without the symbols
+    """
+    symbols = set(symbols)
+    fixed = set()
+
+    def visit(expr) -> bool:
+        if type(expr) == dict:
+            isFixed = [visit(key) & visit(val) for key, val in expr.items()]
+            return all(isFixed)
+        elif type(expr) == Symbol:
+            isFixed = expr not in symbols
+        elif type(expr) in (Pow, Add, Mul):
+            isFixed = all([visit(arg) for arg in expr.args])
+        else:
+            isFixed = True
+        if isFixed:
+            fixed.add(expr)
+        return isFixed
+
+    visit(expr)
+    return fixed
+
+
+def shiftSymbols(expr, mapping: dict, fixed: set = frozenset()):
+    """
+    Rename the symbols of an expression or a factorized rule without
+    evaluating it again. Only valid if the mapping keeps the order of
+    the symbol names, see keepsOrder.
+
+    Parameters
+    ----------
+    expr : sy.Expr or dict
+        Expression or factorized rule
+    mapping : dict
+        Old symbol to new symbol
+    fixed : set, optional
+        Sub-expressions not containing the renamed symbols, which are
+        reused as they are (see getFixedTerms)
+
+    Returns
+    -------
+    expr : sy.Expr or dict
+        Renamed expression or factorized rule
+    """
+    if type(expr) == dict:
+        return {shiftSymbols(key, mapping, fixed): shiftSymbols(val, mapping, fixed) for key, val in expr.items()}
+    elif expr in fixed:
+        return expr
+    elif type(expr) == Symbol:
+        return mapping.get(expr, expr)
+    elif type(expr) == Pow:
+        return Pow(shiftSymbols(expr.base, mapping, fixed), expr.exp, evaluate=False)
+    elif type(expr) == Add or type(expr) == Mul:
+        args = [arg if arg in fixed else shiftSymbols(arg, mapping, fixed) for arg in expr.args]
+        return expr._from_args(tuple(args), expr.is_commutative)
+    else:
+        return expr
+
+
 def printFacto(dico: dict, tab: int = 0) -> None:
     """
     Prints factorized expression stored as dictionary
@@ -308,11 +475,14 @@ class Generator:
     Helper class to generate block iterations.
     If "checks" consecutive numbers of block iterations have the same
     pattern, use this pattern to generate all following rules.
+
+    Rules are compared in offset form, i.e each unknown u_m^l of the
+    rule of block n is replaced by its offset (n - m, k - l).
     """
 
     def __init__(self, k: int, checks: int = 3) -> None:
         """
-        Prints factorized expression stored as dictionary
+        Initialize the generator for one iteration
 
         Parameters
         ----------
@@ -323,12 +493,30 @@ class Generator:
         """
         self.k = k  # Current iteration
         self.mode = 0  # Operation mode: 0: check | 1: Pattern found
-        self.his = []  # History of last block rules
+        self.his = deque(maxlen=checks)  # Last block rules in offset form
         self.checks = checks  # Number of checks
-        self.generater = ''  # String representing block iteration
-        self.translate = {}  # Helper string to symbols
+        self.template = None  # Rule used to generate following rules
+        self.templateBlock = 0  # Block of the template rule
 
-    def check(self, expr: sy.Expr, n: int):
+    def offsetForm(self, form: Form, n: int) -> Form:
+        """
+        Write the unknowns of a rule as (n, k) offsets
+
+        Parameters
+        ----------
+        form : Form
+            Rule for block n
+        n : int
+            Current block
+
+        Returns
+        -------
+        offsets : Form
+            Rule with (Δn, Δk) instead of unknowns
+        """
+        return form.mapUnknowns(lambda u: (n - u[0], self.k - u[1]))
+
+    def check(self, form: Form, n: int):
         """
         Check if block rule of block *n* follows the
         pattern of previous block rules
@@ -337,35 +525,20 @@ class Generator:
 
         Parameters
         ----------
-        expr : sy.Expr
+        form : Form
             Newest rule for block n
         n: int
             Current block
         """
-        expr_str = f'{expr}'
-        unknowns = list(set(re.findall(re.compile('u_\d+\^\d+'), expr_str)))
-        tmpWildcard = {}
-        for i in range(len(unknowns)):
-            tmp_split = re.split('_|\^', unknowns[i])
-            iteration = int(tmp_split[2])
-            block = int(tmp_split[1])
-            tmp_block = f'n-{n - int(block)}' if n - int(block) != 0 else 'n'
-            tmp_iter = f'k-{self.k - iteration}' if self.k - iteration != 0 else 'k'
-            tmp_str = f'u_{tmp_block}^{tmp_iter}'
-            expr_str = expr_str.replace(unknowns[i], tmp_str)
-            tmpWildcard[f'x{i}'] = unknowns[i].replace('^', '\^')
-            self.translate[f'x{i}'] = [n - int(block), self.k - iteration]
-        self.his.append(expr_str)
-
-        if len(self.his) >= self.checks:
-            if len(set(self.his[-self.checks:])) == 1:
-                self.mode = 1
-                self.generater = expr
-                for key, val in tmpWildcard.items():
-                    self.generater = self.generater.replace(lambda expr: re.match(val, str(expr)),
-                                                            lambda expr: sy.Symbol(key, commutative=False))
-
-    def generatingExpr(self, n: int):
+        offsets = self.offsetForm(form, n)
+        self.his.append(offsets)
+
+        if len(self.his) == self.checks and all(rule == offsets for rule in self.his):
+            self.mode = 1
+            self.template = form
+            self.templateBlock = n
+
+    def generatingExpr(self, n: int) -> Form:
         """
         Generate expression for block *n*
 
@@ -374,8 +547,4 @@ class Generator:
         n : int
             Create iteration for block n
         """
-        tmp = self.generater
-        for key, val in self.translate.items():
-            tmp = tmp.replace(lambda expr: re.match(key, str(expr)),
-                              lambda expr: sy.symbols(f'u_{n - val[0]}^{self.k - val[1]}', commutative=False))
-        return tmp
+        return self.template.shift(n - self.templateBlock)
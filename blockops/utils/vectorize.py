@@ -6,6 +6,7 @@ Created on Thu Dec 29 17:18:03 2022
 Utility functions for vector computations
 """
 import numpy as np
+from scipy.linalg import lu_factor, lu_solve
 
 
 def matVecMul(mat, u):
@@ -57,13 +58,122 @@ def matVecInv(mat, u):
     - matVecInv for (nDOF, M, M), (M,) -> (nDOF, M) <=> (M, M) \ (M,) for each nDOF
     - matVecInv for (M, M), (M,)) -> (M,) <=> (M, M) \ (M,)
     """
-    try:
-        return np.linalg.solve(mat, u)
-    except ValueError:
-        try:
-            return np.linalg.solve(mat[None, ...], u)
-        except ValueError:
-            return np.linalg.solve(mat, u[None, ...])
+    u = np.broadcast_to(u, np.broadcast_shapes(mat.shape[:-2], u.shape[:-1]) + u.shape[-1:])
+    return np.linalg.solve(mat, u[..., None]).squeeze(axis=-1)
+
+
+def luFactor(mat):
+    r"""
+    Compute vectorized LU factorization with partial pivoting :math:`PA=LU`
+
+    Parameters
+    ----------
+    mat : np.ndarray, size (nDOF, M, M) or (M, M)
+        Matrix or array of matrices.
+
+    Returns
+    -------
+    lu : np.ndarray, size (nDOF, M, M) or (M, M)
+        Unit lower triangular L and upper triangular U stored in one array.
+    piv : np.ndarray, size (nDOF, M) or (M,)
+        Row interchanges, with the same convention as scipy.linalg.lu_factor.
+
+    Notes
+    -----
+    - luFactor for (M, M) <=> scipy.linalg.lu_factor
+    - luFactor for (nDOF, M, M) does the same elimination on all nDOF matrices
+      at once, one column at a time. The returned lu is a view on an array
+      stored component by component, such that each lu[..., i, j] is
+      contiguous for the triangular solves of luSolve.
+    """
+    mat = np.asarray(mat)
+    if mat.ndim == 2:
+        return lu_factor(mat, check_finite=False)
+    M, batch = mat.shape[-1], mat.shape[:-2]
+    lu = np.moveaxis(mat.reshape(-1, M, M), 0, -1)
+    lu = lu.astype(np.result_type(mat.dtype, float), order='C')
+    piv = np.empty((M, lu.shape[-1]), dtype=np.int32)
+    idx = np.arange(lu.shape[-1])
+    for j in range(M):
+        p = j + np.argmax(np.abs(lu[j:, j]), axis=0)
+        piv[j] = p
+        rowJ, rowP = lu[j].T.copy(), lu[p, :, idx]
+        lu[p, :, idx] = rowJ
+        lu[j] = rowP.T
+        pivot = lu[j, j]
+        if not np.all(pivot):
+            raise np.linalg.LinAlgError('Singular matrix')
+        lu[j+1:, j] /= pivot
+        lu[j+1:, j+1:] -= lu[j+1:, j, None] * lu[j, None, j+1:]
+    lu = np.moveaxis(lu.reshape((M, M) + batch), (0, 1), (-2, -1))
+    return lu, np.moveaxis(piv.reshape((M,) + batch), 0, -1)
+
+
+def luSolve(factor, u, trans=False):
+    r"""
+    Compute vectorized Matrix Vector Inversion :math:`A^{-1}x` from the LU
+    factorization of A, with triangular solves
+
+    Parameters
+    ----------
+    factor : tuple
+        The (lu, piv) factorization of A returned by luFactor.
+    u : np.ndarray, size (nDOF, M) or (M,)
+        Vector or array of vectors.
+    trans : bool, optional
+        Solve with the transpose of A instead. The default is False.
+
+    Returns
+    -------
+    out : np.ndarray, size (nDOF, M) or (M,)
+        The computed matrix-vector inversion(s)
+
+    Notes
+    -----
+    Same broadcasting rules as matVecInv.
+    """
+    lu, piv = factor
+    M = lu.shape[-1]
+    if lu.ndim == 2:
+        x = lu_solve(factor, u.reshape(-1, M).T, trans=int(trans), check_finite=False)
+        return x.T.reshape(u.shape)
+
+    # Solution stored component by component, as the factorization
+    batch = np.broadcast_shapes(lu.shape[:-2], u.shape[:-1])
+    x = np.empty((M,) + batch, dtype=np.result_type(lu.dtype, u.dtype))
+    x[:] = np.moveaxis(np.broadcast_to(u, batch + (M,)), -1, 0)
+
+    def swap(i):
+        p = np.broadcast_to(piv[..., i], batch)
+        if np.all(p == i):
+            return
+        xi = x[i].copy()
+        x[i] = np.take_along_axis(x, p[None], axis=0)[0]
+        np.put_along_axis(x, p[None], xi[None], axis=0)
+
+    if not trans:
+        # L U x = P u
+        for i in range(M):
+            swap(i)
+        for i in range(M):
+            for k in range(i):
+                x[i] -= lu[..., i, k]*x[k]
+        for i in reversed(range(M)):
+            for k in range(i+1, M):
+                x[i] -= lu[..., i, k]*x[k]
+            x[i] /= lu[..., i, i]
+    else:
+        # U^T L^T P x = u
+        for i in range(M):
+            for k in range(i):
+                x[i] -= lu[..., k, i]*x[k]
+            x[i] /= lu[..., i, i]
+        for i in reversed(range(M)):
+            for k in range(i+1, M):
+                x[i] -= lu[..., k, i]*x[k]
+        for i in reversed(range(M)):
+            swap(i)
+    return np.moveaxis(x, 0, -1)
 
 
 def matMatMul(m1, m2):
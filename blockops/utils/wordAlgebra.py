@@ -0,0 +1,737 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 09:12:54 2026
+
+Native non-commutative word algebra used to generate the block rules.
+
+Products of block operators are stored as interned integer *words*, and sums
+of products applied to approximations u_n^k as coefficient maps over
+(word, atom) pairs. An atom is either an unknown (n, k) or a nested sum,
+which reproduces how SymPy keeps products like G*(a + b) unexpanded during
+substitutions. SymPy is used to read the block operator symbols, to display
+the rules, and to factorize them (see expr.getFactorizedRule): the task graph
+follows SymPy's canonical order of the terms, such that the factorization
+stays with SymPy.
+"""
+import heapq
+from fractions import Fraction
+from itertools import islice
+import sympy as sy
+
+
+def toNumber(c):
+    """
+    Convert a (SymPy) scalar coefficient into a native Python number
+
+    Parameters
+    ----------
+    c : int, float, Fraction, sy.Expr
+        The coefficient
+
+    Returns
+    -------
+    c : int, Fraction, float or sy.Expr
+        The coefficient, kept as SymPy expression if not a number
+    """
+    if isinstance(c, Fraction):
+        return c.numerator if c.denominator == 1 else c
+    if isinstance(c, (int, float, complex)):
+        return c
+    if c.is_Integer:
+        return int(c)
+    if c.is_Rational:
+        return Fraction(int(c.p), int(c.q))
+    if c.is_Float:
+        return float(c)
+    return c
+
+
+def extractCoeff(c, a):
+    """
+    Extract the coefficient *a* from *c*, following the rules of SymPy's
+    extract_multiplicatively (an integer must stay an integer, a positive
+    number cannot become negative)
+
+    Parameters
+    ----------
+    c : number
+        Coefficient of the term
+    a : number
+        Coefficient to extract
+
+    Returns
+    -------
+    q : number or None
+        Quotient if extraction is possible, None otherwise
+    """
+    if a == 1:
+        return c
+    if c == a:
+        return 1
+    if isinstance(c, (int, Fraction)) and isinstance(a, (int, Fraction)):
+        q = Fraction(c) / Fraction(a)
+        if isinstance(c, int) and q.denominator != 1:
+            return None
+        q = toNumber(q)
+    else:
+        q = c / a
+    try:
+        if c > 0 and q < 0:
+            return None
+    except TypeError:
+        pass
+    return q
+
+
+class Form(object):
+    """
+    Linear combination of (word, atom) terms. Atoms are either unknowns,
+    stored as (n, k) tuples, or nested Form objects.
+    Forms are hashable and must not be modified once built.
+    """
+
+    __slots__ = ('terms', '_hash')
+
+    def __init__(self, terms: dict = None) -> None:
+        """
+        Constructor
+
+        Parameters
+        ----------
+        terms : dict
+            Coefficients of the form, with (word, atom) as keys
+        """
+        self.terms = {} if terms is None else terms
+        self._hash = None
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset(self.terms.items()))
+        return self._hash
+
+    def __eq__(self, other):
+        return isinstance(other, Form) and self.terms == other.terms
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __reduce__(self):
+        return Form, (self.terms,)
+
+    def __repr__(self):
+        return f'Form({self.terms})'
+
+    @property
+    def isAtomic(self) -> bool:
+        """Zero or a single unknown (SymPy expressions without args)"""
+        if len(self.terms) == 0:
+            return True
+        if len(self.terms) > 1:
+            return False
+        ((word, atom), c), = self.terms.items()
+        return word == 0 and c == 1 and type(atom) is tuple
+
+    def atoms(self) -> set:
+        """Return all the unknowns used in the form (including nested sums)"""
+        out = set()
+        for (_, atom) in self.terms:
+            if type(atom) is tuple:
+                out.add(atom)
+            else:
+                out.update(atom.atoms())
+        return out
+
+    def mapUnknowns(self, func):
+        """
+        Create a new form by transforming all unknowns
+
+        Parameters
+        ----------
+        func : callable
+            Takes an unknown (n, k) and returns the new unknown
+
+        Returns
+        -------
+        form : Form
+            The new form
+        """
+        return Form({(word, func(atom) if type(atom) is tuple else atom.mapUnknowns(func)): c
+                     for (word, atom), c in self.terms.items()})
+
+    def shift(self, dn: int):
+        """Create a new form with all block indices shifted by *dn*"""
+        return self.mapUnknowns(lambda u: (u[0] + dn, u[1]))
+
+
+class WordAlgebra(object):
+    """
+    Storage for the letters and words of a block iteration, with
+    all the operations needed to generate the block rules.
+    """
+
+    def __init__(self, rules: dict = None) -> None:
+        """
+        Constructor
+
+        Parameters
+        ----------
+        rules : dict
+            Rules to simplify operator products (SymPy key and value)
+        """
+        self.letters = []  # SymPy representation of each letter
+        self.letterIds = {}  # Letter identifier from SymPy representation
+        self.inverse = []  # Identifier of the inverse letter (-1 if none)
+        self.words = [()]  # Letters of each word, word 0 is the identity
+        self.wordIds = {(): 0}  # Word identifier from its letters
+        self.concatCache = {}  # Cache for word concatenation
+        self.prefixCache = {}  # Cache for word suffix removal
+        self.operatorCache = {}  # Cache for operator conversion
+        self.symbols = {}  # SymPy symbols of the unknowns
+        self.rules = []  # List of (pattern, coefficient, replacement) rules
+        self.rewriteCache = {}  # Cache for word rewriting with the rules
+        if rules:
+            for key, value in rules.items():
+                pattern = self.operator(key)
+                repl = self.operator(value)
+                if len(pattern) != 1 or pattern[0][0] != 1 or len(repl) > 1:
+                    raise ValueError(f'cannot use rule {key} -> {value} to simplify products')
+                c, word = repl[0] if len(repl) == 1 else (0, 0)
+                self.rules.append((self.words[pattern[0][1]], c, self.words[word]))
+            self.rules.sort(key=lambda r: -len(r[0]))
+
+    # -------------------------------------------------------------------------
+    # Letters and words
+    # -------------------------------------------------------------------------
+    def letter(self, expr) -> int:
+        """
+        Get the identifier of a letter, creating it if necessary
+
+        Parameters
+        ----------
+        expr : sy.Expr
+            SymPy representation of the letter (symbol, inverse of a symbol,
+            or any other non-commutative factor)
+
+        Returns
+        -------
+        letter : int
+            Letter identifier
+        """
+        try:
+            return self.letterIds[expr]
+        except KeyError:
+            pass
+        if isinstance(expr, sy.Symbol) or (isinstance(expr, sy.Pow) and expr.exp == -1
+                                           and isinstance(expr.base, sy.Symbol)):
+            base = expr if isinstance(expr, sy.Symbol) else expr.base
+            for e in [base, base ** (-1)]:
+                self.letterIds[e] = len(self.letters)
+                self.letters.append(e)
+            self.inverse += [len(self.letters) - 1, len(self.letters) - 2]
+        else:
+            self.letterIds[expr] = len(self.letters)
+            self.letters.append(expr)
+            self.inverse.append(-1)
+        return self.letterIds[expr]
+
+    def word(self, letters: tuple) -> int:
+        """Get the identifier of a (reduced) word from its letters"""
+        try:
+            return self.wordIds[letters]
+        except KeyError:
+            self.wordIds[letters] = len(self.words)
+            self.words.append(letters)
+            return len(self.words) - 1
+
+    def reduce(self, letters: list) -> tuple:
+        """Cancel adjacent letters with their inverse"""
+        out = []
+        for letter in letters:
+            if out and self.inverse[letter] == out[-1]:
+                out.pop()
+            else:
+                out.append(letter)
+        return tuple(out)
+
+    def concat(self, w1: int, w2: int) -> int:
+        """Concatenate two words (product of the operators)"""
+        if w1 == 0:
+            return w2
+        if w2 == 0:
+            return w1
+        try:
+            return self.concatCache[(w1, w2)]
+        except KeyError:
+            word = self.word(self.reduce(self.words[w1] + self.words[w2]))
+            self.concatCache[(w1, w2)] = word
+            return word
+
+    def prefix(self, word: int, suffix: int) -> int:
+        """
+        Remove a suffix of a word
+
+        Returns
+        -------
+        prefix : int
+            The remaining word, -1 if *suffix* does not end *word*
+        """
+        try:
+            return self.prefixCache[(word, suffix)]
+        except KeyError:
+            letters, end = self.words[word], self.words[suffix]
+            if len(end) <= len(letters) and letters[len(letters) - len(end):] == end:
+                res = self.word(letters[:len(letters) - len(end)])
+            else:
+                res = -1
+            self.prefixCache[(word, suffix)] = res
+            return res
+
+    def operator(self, expr) -> tuple:
+        """
+        Convert a block operator symbol into a sum of words
+
+        Parameters
+        ----------
+        expr : sy.Expr, int, float
+            Symbol of the block operator
+
+        Returns
+        -------
+        terms : tuple
+            Tuple of (coefficient, word) pairs
+        """
+        try:
+            return self.operatorCache[expr]
+        except (KeyError, TypeError):
+            pass
+        terms = {}
+        for term in sy.Add.make_args(sy.expand(sy.sympify(expr))):
+            c, nc = term.args_cnc()
+            coeff = toNumber(sy.Mul(*c))
+            if coeff == 0:
+                continue
+            letters = []
+            for factor in nc:
+                base, e = factor.as_base_exp()
+                if e.is_Integer and e != 0:
+                    letters += [self.letter(base if e > 0 else base ** (-1))] * abs(int(e))
+                else:
+                    letters.append(self.letter(factor))
+            word = self.word(self.reduce(letters))
+            terms[word] = terms.get(word, 0) + coeff
+        terms = tuple((c, word) for word, c in terms.items() if c != 0)
+        try:
+            self.operatorCache[expr] = terms
+        except TypeError:
+            pass
+        return terms
+
+    # -------------------------------------------------------------------------
+    # Forms construction
+    # -------------------------------------------------------------------------
+    def addTerm(self, terms: dict, c, word: int, atom) -> None:
+        """
+        Add a term to a dictionary of terms, flattening nested sums the
+        same way SymPy does
+
+        Parameters
+        ----------
+        terms : dict
+            Dictionary of terms to be updated
+        c : number
+            Coefficient of the term
+        word : int
+            Operator word of the term
+        atom : tuple or Form
+            Unknown or nested sum
+        """
+        if type(atom) is not tuple:
+            nTerms = len(atom.terms)
+            if nTerms == 0:
+                return
+            if nTerms == 1:
+                ((w, a), c2), = atom.terms.items()
+                self.addTerm(terms, toNumber(c * c2), self.concat(word, w), a)
+                return
+            if word == 0 and c == 1:
+                for (w, a), c2 in atom.terms.items():
+                    self.addTerm(terms, c2, w, a)
+                return
+        key = (word, atom)
+        c = terms.get(key, 0) + c
+        if c == 0:
+            terms.pop(key, None)
+        else:
+            terms[key] = c
+
+    def apply(self, op, u: tuple) -> Form:
+        """
+        Create the form op*u
+
+        Parameters
+        ----------
+        op : sy.Expr, int
+            Symbol of the block operator
+        u : tuple
+            The unknown (n, k)
+
+        Returns
+        -------
+        form : Form
+            The product
+        """
+        terms = {}
+        for c, word in self.operator(op):
+            self.addTerm(terms, c, word, u)
+        return Form(terms)
+
+    def add(self, *forms) -> Form:
+        """Sum several forms"""
+        terms = {}
+        for form in forms:
+            for (word, atom), c in form.terms.items():
+                self.addTerm(terms, c, word, atom)
+        return Form(terms)
+
+    # -------------------------------------------------------------------------
+    # Substitutions
+    # -------------------------------------------------------------------------
+    def substitute(self, form: Form, mapping: dict) -> Form:
+        """
+        Replace simultaneously unknowns by forms (SymPy subs with symbols
+        as keys), without expanding products with sums
+
+        Parameters
+        ----------
+        form : Form
+            The form to substitute into
+        mapping : dict
+            Unknowns as keys, forms as values
+
+        Returns
+        -------
+        form : Form
+            The new form (the same object if nothing changed)
+        """
+        changed = False
+        terms = {}
+        for (word, atom), c in form.terms.items():
+            if type(atom) is tuple:
+                if atom in mapping:
+                    changed = True
+                    self.addTerm(terms, c, word, mapping[atom])
+                    continue
+            else:
+                new = self.substitute(atom, mapping)
+                if new is not atom:
+                    changed = True
+                    self.addTerm(terms, c, word, new)
+                    continue
+            self.addTerm(terms, c, word, atom)
+        return Form(terms) if changed else form
+
+    def rewrite(self, word: int) -> tuple:
+        """
+        Apply the simplification rules on a word (non-overlapping
+        occurrences, from left to right)
+
+        Returns
+        -------
+        c : number
+            Coefficient produced by the rules
+        word : int
+            Rewritten word
+        """
+        try:
+            return self.rewriteCache[word]
+        except KeyError:
+            pass
+        coeff, letters = 1, self.words[word]
+        for pattern, c, repl in self.rules:
+            if c == 0 and pattern in [letters[i:i + len(pattern)] for i in range(len(letters))]:
+                coeff, letters = 0, ()
+                break
+            out, i, L = [], 0, len(pattern)
+            while i < len(letters):
+                if letters[i:i + L] == pattern:
+                    out += repl
+                    coeff *= c
+                    i += L
+                else:
+                    out.append(letters[i])
+                    i += 1
+            letters = self.reduce(out)
+        res = (toNumber(coeff), self.word(letters))
+        self.rewriteCache[word] = res
+        return res
+
+    def applyRules(self, form: Form) -> Form:
+        """Apply the simplification rules on all operator products of a form"""
+        if not self.rules:
+            return form
+        changed = False
+        terms = {}
+        for (word, atom), c in form.terms.items():
+            c2, newWord = self.rewrite(word)
+            if type(atom) is not tuple:
+                newAtom = self.applyRules(atom)
+            else:
+                newAtom = atom
+            if c2 != 1 or newWord != word or newAtom is not atom:
+                changed = True
+            self.addTerm(terms, toNumber(c * c2), newWord, newAtom)
+        return Form(terms) if changed else form
+
+    def contract(self, form: Form, key: Form, value: tuple) -> Form:
+        """
+        Replace an already computed expression *key* by the unknown *value*
+        (SymPy subs with an expression as key)
+
+        Parameters
+        ----------
+        form : Form
+            The form to simplify
+        key : Form
+            Computed expression
+        value : tuple
+            Unknown storing the computed expression
+
+        Returns
+        -------
+        form : Form
+            The new form (the same object if nothing changed)
+        """
+        if len(key.terms) == 1:
+            ((suffix, x), a), = key.terms.items()
+            return self.contractTerm(form, suffix, x, a, value)
+        elif len(key.terms) > 1:
+            neg = Form({k: -c for k, c in key.terms.items()})
+            return self.contractSum(form, key, neg, value)
+        return form
+
+    def contractTerm(self, form: Form, suffix: int, x, a, value: tuple) -> Form:
+        """Contraction of a single term a*suffix*x, see contract"""
+        changed = False
+        terms = {}
+        for (word, atom), c in form.terms.items():
+            if atom == x:
+                prefix = self.prefix(word, suffix)
+                if prefix != -1:
+                    q = extractCoeff(c, a)
+                    if q is not None:
+                        changed = True
+                        self.addTerm(terms, q, prefix, value)
+                        continue
+            elif type(atom) is not tuple:
+                new = self.contractTerm(atom, suffix, x, a, value)
+                if new is not atom:
+                    changed = True
+                    self.addTerm(terms, c, word, new)
+                    continue
+            self.addTerm(terms, c, word, atom)
+        return Form(terms) if changed else form
+
+    def contractSum(self, form: Form, key: Form, neg: Form, value: tuple) -> Form:
+        """Contraction of a sum (key) and its opposite (neg), see contract"""
+        if form == key:
+            return Form({(0, value): 1})
+        if form == neg:
+            return Form({(0, value): -1})
+        node = form.terms
+        changed = False
+        if len(key.terms) < len(node):
+            for ref, sign in [(key, 1), (neg, -1)]:
+                if all(node.get(t, None) == c for t, c in ref.terms.items()):
+                    node = {t: c for t, c in node.items() if t not in ref.terms}
+                    node[(0, value)] = node.get((0, value), 0) + sign
+                    changed = True
+                    break
+        terms = {}
+        for (word, atom), c in node.items():
+            if type(atom) is not tuple:
+                new = self.contractSum(atom, key, neg, value)
+                if new is not atom:
+                    changed = True
+                    atom = new
+            self.addTerm(terms, c, word, atom)
+        return Form(terms) if changed else form
+
+    def containsProduct(self, form: Form, op, u: tuple) -> bool:
+        """
+        Check if a form contains a term ending with op*u (op being a
+        single operator product)
+        """
+        ops = self.operator(op)
+        if len(ops) != 1:
+            return False
+        suffix = ops[0][1]
+        for (word, atom), c in form.terms.items():
+            if atom == u:
+                if self.prefix(word, suffix) != -1:
+                    return True
+            elif type(atom) is not tuple and self.containsProduct(atom, op, u):
+                return True
+        return False
+
+    def nodes(self, form: Form) -> int:
+        """Number of nodes of the SymPy tree representing a form"""
+        count = [self.termNodes(c, word, atom) for (word, atom), c in form.terms.items()]
+        if len(count) == 1:
+            return count[0]
+        return 1 + sum(count)
+
+    def termNodes(self, c, word, atom) -> int:
+        """Number of nodes of the SymPy tree representing a term"""
+        atomNodes = 1 if type(atom) is tuple else self.nodes(atom)
+        if c == 1 and word == 0:
+            return atomNodes
+        factors = [1 if c != 1 else 0]
+        letters = self.words[word]
+        i = 0
+        while i < len(letters):
+            j = i
+            while j < len(letters) and letters[j] == letters[i]:
+                j += 1
+            factors.append(1 if (j - i == 1 and isinstance(self.letters[letters[i]], sy.Symbol))
+                           else 3)
+            i = j
+        return 1 + sum(factors) + atomNodes
+
+    # -------------------------------------------------------------------------
+    # SymPy representation
+    # -------------------------------------------------------------------------
+    def symbol(self, u: tuple) -> sy.Symbol:
+        """SymPy symbol associated to an unknown"""
+        try:
+            return self.symbols[u]
+        except KeyError:
+            sym = sy.Symbol(f'u_{u[0]}^{u[1]}', commutative=False)
+            self.symbols[u] = sym
+            return sym
+
+    def toSympy(self, form: Form) -> sy.Expr:
+        """
+        Convert a form into a SymPy expression
+
+        Parameters
+        ----------
+        form : Form
+            The form to convert
+
+        Returns
+        -------
+        expr : sy.Expr
+            The SymPy expression
+        """
+        args = []
+        for (word, atom), c in form.terms.items():
+            atomExpr = self.symbol(atom) if type(atom) is tuple else self.toSympy(atom)
+            factors = [self.letters[letter] for letter in self.words[word]]
+            args.append(sy.Mul(sy.sympify(c), *factors, atomExpr))
+        if len(args) == 0:
+            return sy.core.numbers.Zero()
+        return sy.Add(*args)
+
+
+class ContractionIndex(object):
+    """
+    Index of the computed expressions of a dictionary (computed expression
+    to unknown), used to replace them in a form with WordAlgebra.contract.
+
+    Each computed expression is indexed by one of its atoms: it can only be
+    contracted in a form containing this atom. Contracting a form visits
+    only these candidates, in the order of the dictionary (or by decreasing
+    size), such that the result is the same as contracting all keys one
+    after the other, for a cost depending on the size of the form and not
+    on the size of the dictionary.
+    """
+
+    def __init__(self, algebra: WordAlgebra, table: dict) -> None:
+        """
+        Constructor
+
+        Parameters
+        ----------
+        algebra : WordAlgebra
+            Algebra of the forms
+        table : dict
+            Computed expressions (Form) as keys, unknowns as values. Keys
+            can be added to the dictionary after the index is created,
+            but not removed.
+        """
+        self.algebra = algebra
+        self.table = table
+        self.position = {}  # Position of each key in the dictionary
+        self.nodes = {}  # Size of each key, computed when needed
+        self.atomKeys = {}  # Keys indexed by one of their atoms
+
+    def update(self) -> None:
+        """Index the keys added to the dictionary"""
+        nNew = len(self.table) - len(self.position)
+        if nNew <= 0:
+            return
+        for key in reversed(list(islice(reversed(self.table), nNew))):
+            self.position[key] = len(self.position)
+            if len(key.terms) > 0:
+                (_, atom) = next(iter(key.terms))
+                self.atomKeys.setdefault(atom, []).append(key)
+
+    def rank(self, key: Form, bySize: bool):
+        """Order in which the keys are contracted"""
+        if not bySize:
+            return self.position[key]
+        try:
+            nodes = self.nodes[key]
+        except KeyError:
+            nodes = self.nodes[key] = self.algebra.nodes(key)
+        return -nodes, self.position[key]
+
+    @staticmethod
+    def allAtoms(form: Form, out: set) -> set:
+        """Unknowns and nested sums contained in a form"""
+        for (_, atom) in form.terms:
+            if atom not in out:
+                out.add(atom)
+                if type(atom) is not tuple:
+                    ContractionIndex.allAtoms(atom, out)
+        return out
+
+    def contract(self, form: Form, bySize: bool = False) -> Form:
+        """
+        Replace all computed expressions of the dictionary in a form
+
+        Parameters
+        ----------
+        form : Form
+            The form to simplify
+        bySize : bool
+            Contract the largest expressions first (default: dictionary order)
+
+        Returns
+        -------
+        form : Form
+            The new form (the same object if nothing changed)
+        """
+        self.update()
+        seen = set()  # Keys already in the heap
+        heap = []
+        self.push(form, heap, seen, bySize)
+        while heap:
+            rank, key = heapq.heappop(heap)
+            new = self.algebra.contract(form, key, self.table[key])
+            if new is not form:
+                form = new
+                # Contraction may create atoms used by the next keys
+                self.push(form, heap, seen, bySize, minRank=rank)
+        return form
+
+    def push(self, form: Form, heap: list, seen: set, bySize: bool, minRank=None) -> None:
+        """Add the keys that may be contracted in a form to the heap of candidates"""
+        for atom in self.allAtoms(form, set()):
+            for key in self.atomKeys.get(atom, ()):
+                if key not in seen:
+                    rank = self.rank(key, bySize)
+                    if minRank is None or rank > minRank:
+                        seen.add(key)
+                        heapq.heappush(heap, (rank, key))
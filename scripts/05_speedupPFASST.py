@@ -47,20 +47,10 @@ errApproxMax = np.max(errApprox, axis=(0, -1)).reshape(lam.shape)
 stab = np.abs(uApprox)[0, :, -1].reshape(lam.shape)
 # plotAccuracyContour(reLam, imLam, errApproxMax, stab, figName='coarseErr')
 
-# Compute PinT solution and error
-nIterMax = nBlocks
-uPar = algo(nIter=nIterMax)
-errPinT = np.abs(uNum - uPar)
-errPinTMax = np.max(errPinT, axis=(1, -1)).reshape(
-    (errPinT.shape[0],) + (lam.shape))
-
 # Compute required number of iterations to discretization error
-nIter = -np.ones_like(errDiscrMax, dtype=int)
-nIter *= 2
-k = errPinT.shape[0] - 1
-for err in errPinTMax[-1::-1]:
-    nIter[err < errDiscrMax] = k
-    k -= 1
+nIterMax = nBlocks
+nIter = algo.getIterations(nIter=nIterMax, uRef=uNum, tol=errDiscrMax.ravel()).reshape(lam.shape)
+nIter[nIter == -1] = -2
 
 # Plot number of iteration until discretization error
 # plotContour(reLam=reLam, imLam=imLam, val=nIter, nLevels=None, figName='PinTIter')
@@ -68,19 +68,10 @@ if plotApproxError:
     plt.tight_layout()
     
 
-# Compute PinT solution and error
-nIterMax = nBlocks
-uPar = algo(nIter=nIterMax)
-errPinT = np.abs(uNum - uPar)
-errPinTMax = np.max(errPinT, axis=(1, -1)).reshape(
-    (errPinT.shape[0],) + (lam.shape))
-
 # Compute required number of iterations to discretization error
-nIter = np.zeros_like(errDiscrMax, dtype=int)
-k = errPinT.shape[0] - 1
-for err in errPinTMax[-1::-1]:
-    nIter[err < errDiscrMax] = k
-    k -= 1
+nIterMax = nBlocks
+nIter = algo.getIterations(nIter=nIterMax, uRef=uNum, tol=errDiscrMax.ravel())
+nIter[nIter == -1] = 0
 
 if plotNumIter:
     # Plot number of iteration until discretization error
@@ -1,3 +1,4 @@
+import os
 import numpy as np
 
 from blockops import BlockOperator, BlockIteration, I, PintRun
@@ -7,6 +8,10 @@ from blockops import BlockProblem
 nBlocks = 100
 kMax = 10
 
+# State of each run is saved after each iteration, an interrupted script
+# resumes from there when started again
+checkpointDir = 'checkpoints'
+
 g = BlockOperator('G', cost=1)  # coarse solver
 f = BlockOperator('F', cost=10)  # fine solver
 r = BlockOperator('R', cost=0.2)  # restriction
@@ -75,5 +80,6 @@ algs = {
 
 for key, value in algs.items():
     K = value.checkK(N=nBlocks, K=kMax)
-    run = PintRun(blockIteration=value, nBlocks=nBlocks, kMax=K)
-    picklePintRun(key, run, value)
+    run = PintRun(blockIteration=value, nBlocks=nBlocks, kMax=K, useLookup=False,
+                  checkpoint=os.path.join(checkpointDir, key.replace('.pickle', '.checkpoint')))
+    picklePintRun(run, value)